@@ -0,0 +1,95 @@
+"""
+Поля ответов API.
+
+Каждое поле знает, какие колонки и связи ему нужны, поэтому при
+выборке части полей (?fields=id,text) из БД читаются только эти
+колонки, а связанные объекты подтягиваются одним JOIN.
+"""
+from collections import namedtuple
+
+
+class InvalidFields(Exception):
+    pass
+
+
+Field = namedtuple('Field', ('get', 'columns', 'related'))
+
+
+def field(get, columns, related=()):
+    return Field(get, tuple(columns), tuple(related))
+
+
+def image_url(image):
+    return image.url if image else None
+
+
+POST_FIELDS = {
+    'id': field(lambda post: post.pk, ('id',)),
+    'text': field(lambda post: post.text, ('text',)),
+    'pub_date': field(lambda post: post.pub_date, ('pub_date',)),
+    'author': field(
+        lambda post: post.author.username,
+        ('author', 'author__username'),
+        ('author',),
+    ),
+    'group': field(
+        lambda post: post.group.slug if post.group_id else None,
+        ('group', 'group__slug'),
+        ('group',),
+    ),
+    'image': field(lambda post: image_url(post.image), ('image',)),
+    'image_width': field(lambda post: post.image_width, ('image_width',)),
+    'image_height': field(
+        lambda post: post.image_height, ('image_height',)
+    ),
+    'comments_count': field(
+        lambda post: post.comments_count, ('comments_count',)
+    ),
+}
+
+GROUP_FIELDS = {
+    'id': field(lambda group: group.pk, ('id',)),
+    'title': field(lambda group: group.title, ('title',)),
+    'slug': field(lambda group: group.slug, ('slug',)),
+    'description': field(lambda group: group.description, ('description',)),
+    'posts_count': field(lambda group: group.posts_count, ('posts_count',)),
+}
+
+COMMENT_FIELDS = {
+    'id': field(lambda comment: comment.pk, ('id',)),
+    'post': field(lambda comment: comment.post_id, ('post',)),
+    'author': field(
+        lambda comment: comment.author.username,
+        ('author', 'author__username'),
+        ('author',),
+    ),
+    'text': field(lambda comment: comment.text, ('text',)),
+    'created': field(lambda comment: comment.created, ('created',)),
+}
+
+
+def select_fields(available, requested):
+    """Поля из ?fields=a,b (все, если параметра нет)"""
+    if not requested:
+        return available
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise InvalidFields(', '.join(unknown))
+    return {name: available[name] for name in names}
+
+
+def restrict_queryset(queryset, fields, required=('id',)):
+    """Читает из БД только колонки выбранных полей"""
+    columns = set(required)
+    related = set()
+    for item in fields.values():
+        columns.update(item.columns)
+        related.update(item.related)
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(columns))
+
+
+def serialize(obj, fields):
+    return {name: item.get(obj) for name, item in fields.items()}
@@ -0,0 +1,111 @@
+import json
+from http import HTTPStatus
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(5)
+        ]
+        Post.objects.create(text='Чужой пост', author=cls.reader)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.reader, text=f'Комментарий {i}'
+            )
+            for i in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get(self, url, client=None, **params):
+        response = (client or self.client).get(url, params)
+        return response, json.loads(response.content)
+
+    def test_posts_cursor_pagination(self):
+        """Посты отдаются страницами по курсору, от новых к старым"""
+        url = reverse('api:posts')
+        response, data = self.get(url, limit=4)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(data['results']), 4)
+        self.assertIsNone(data['previous'])
+        response = self.client.get(data['next'])
+        second = json.loads(response.content)
+        ids = [post['id'] for post in data['results'] + second['results']]
+        self.assertEqual(
+            ids, list(Post.objects.values_list('id', flat=True))
+        )
+        self.assertIsNone(second['next'])
+
+    def test_posts_filters(self):
+        url = reverse('api:posts')
+        _, data = self.get(url, group='group')
+        self.assertEqual(
+            {post['group'] for post in data['results']}, {'group'}
+        )
+        self.assertEqual(len(data['results']), 2)
+        _, data = self.get(url, author='reader')
+        self.assertEqual([post['text'] for post in data['results']],
+                         ['Чужой пост'])
+
+        response, _ = self.get(url, following=1)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        client = Client()
+        client.force_login(self.reader)
+        _, data = self.get(url, client, following=1)
+        self.assertEqual(
+            {post['author'] for post in data['results']}, {'author'}
+        )
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только выбранные поля"""
+        url = reverse('api:post', args=(self.posts[1].id,))
+        _, data = self.get(url, fields='id,author')
+        self.assertEqual(data, {'id': self.posts[1].id, 'author': 'author'})
+        response, data = self.get(url, fields='id,password')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_posts_list_queries(self):
+        """Автор и группа подтягиваются одним запросом со страницей"""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:posts'), {'limit': 100})
+
+    def test_comments_and_groups(self):
+        url = reverse('api:comments', args=(self.posts[0].id,))
+        _, data = self.get(url, limit=2)
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 0', 'Комментарий 1'],
+        )
+        _, data = self.get(reverse('api:groups'), fields='slug,posts_count')
+        self.assertEqual(
+            data['results'], [{'slug': 'group', 'posts_count': 2}]
+        )
+        response, _ = self.get(reverse('api:comments', args=(0,)))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(API_EXPORT_CHUNK_SIZE=2)
+    def test_streaming_export(self):
+        """Выгрузка отдаётся потоком и собирается в корректный JSON"""
+        response = self.client.get(
+            reverse('api:posts_export'), {'fields': 'id'}
+        )
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(data), Post.objects.count())
+        self.assertEqual(set(data[0]), {'id'})
@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts_list, name='posts'),
+    path('posts/export/', views.posts_export, name='posts_export'),
+    path('posts/<int:post_id>/', views.post_detail, name='post'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='comments',
+    ),
+    path('groups/', views.groups_list, name='groups'),
+]
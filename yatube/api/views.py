@@ -0,0 +1,198 @@
+"""
+JSON API только для чтения: посты, группы и комментарии.
+
+Списки постов и комментариев разбиты на страницы курсором
+(posts.paginators.CursorPaginator), ?fields= выбирает поля ответа,
+а /posts/export/ отдаёт все подходящие посты потоком, не собирая
+ответ в памяти.
+"""
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from core.replicas import read_from_replica
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import CursorPaginator, InvalidCursor
+
+from .fields import (
+    COMMENT_FIELDS,
+    GROUP_FIELDS,
+    POST_FIELDS,
+    InvalidFields,
+    restrict_queryset,
+    select_fields,
+    serialize,
+)
+
+JSON_PARAMS = {'ensure_ascii': False}
+EXPORT_BATCH_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def error_response(message, status):
+    return JsonResponse(
+        {'error': message}, status=status, json_dumps_params=JSON_PARAMS
+    )
+
+
+def api_view(view):
+    """GET-представление API, ошибки которого отдаются в JSON"""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return error_response(str(error), error.status)
+        except InvalidFields as error:
+            return error_response(f'Неизвестные поля: {error}', 400)
+    return wrapper
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.POSTS_PER_PAGE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def paginated_response(request, queryset, fields, key, descending=True):
+    paginator = CursorPaginator(
+        queryset, page_size(request), key, descending=descending
+    )
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise ApiError('Неверный курсор')
+    return JsonResponse(
+        {
+            'results': [serialize(obj, fields) for obj in page],
+            'next': page_url(request, page.next_cursor),
+            'previous': page_url(request, page.previous_cursor),
+        },
+        json_dumps_params=JSON_PARAMS,
+    )
+
+
+def filter_posts(request):
+    """Посты с фильтрами ?group=<slug>, ?author=<username>, ?following=1"""
+    posts = Post.objects.all()
+    group = request.GET.get('group')
+    if group:
+        posts = posts.filter(group__slug=group)
+    author = request.GET.get('author')
+    if author:
+        posts = posts.filter(author__username=author)
+    if request.GET.get('following'):
+        if not request.user.is_authenticated:
+            raise ApiError('Нужна авторизация', status=401)
+        posts = posts.filter(
+            author__in=Follow.objects.filter(
+                user=request.user
+            ).values('author_id')
+        )
+    return posts
+
+
+def post_fields(request):
+    fields = select_fields(POST_FIELDS, request.GET.get('fields'))
+    return fields, restrict_queryset(
+        filter_posts(request), fields, required=('id', 'pub_date')
+    )
+
+
+@api_view
+@read_from_replica
+def posts_list(request):
+    fields, posts = post_fields(request)
+    return paginated_response(request, posts, fields, ('pub_date', 'id'))
+
+
+@api_view
+@read_from_replica
+def post_detail(request, post_id):
+    fields = select_fields(POST_FIELDS, request.GET.get('fields'))
+    post = restrict_queryset(Post.objects.all(), fields).filter(
+        pk=post_id
+    ).first()
+    if post is None:
+        raise ApiError('Пост не найден', status=404)
+    return JsonResponse(serialize(post, fields), json_dumps_params=JSON_PARAMS)
+
+
+@api_view
+@read_from_replica
+def post_comments(request, post_id):
+    """Комментарии поста от старых к новым"""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise ApiError('Пост не найден', status=404)
+    fields = select_fields(COMMENT_FIELDS, request.GET.get('fields'))
+    comments = restrict_queryset(
+        Comment.objects.filter(post_id=post_id),
+        fields,
+        required=('id', 'created'),
+    )
+    return paginated_response(
+        request, comments, fields, ('created', 'id'), descending=False
+    )
+
+
+@api_view
+@read_from_replica
+def groups_list(request):
+    """Все группы: их немного, поэтому без паджинации"""
+    fields = select_fields(GROUP_FIELDS, request.GET.get('fields'))
+    groups = restrict_queryset(Group.objects.order_by('pk'), fields)
+    return JsonResponse(
+        {'results': [serialize(group, fields) for group in groups]},
+        json_dumps_params=JSON_PARAMS,
+    )
+
+
+def stream_json_array(objects, fields):
+    """JSON-массив по частям, объекты читаются из БД пачками"""
+    yield '['
+    batch = []
+    first = True
+    for obj in objects:
+        batch.append(json.dumps(
+            serialize(obj, fields), cls=DjangoJSONEncoder, **JSON_PARAMS
+        ))
+        if len(batch) == EXPORT_BATCH_SIZE:
+            yield ('' if first else ',') + ','.join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ('' if first else ',') + ','.join(batch)
+    yield ']'
+
+
+@api_view
+def posts_export(request):
+    """Все подходящие посты одним потоковым ответом"""
+    fields, posts = post_fields(request)
+    objects = posts.order_by('-pub_date', '-id').iterator(
+        chunk_size=settings.API_EXPORT_CHUNK_SIZE
+    )
+    return StreamingHttpResponse(
+        stream_json_array(objects, fields),
+        content_type='application/json',
+    )
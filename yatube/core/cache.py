@@ -0,0 +1,138 @@
+"""
+Кеш страниц с версионированными ключами.
+
+Ключ страницы содержит версии её областей (scope), например
+'posts' или 'group:<slug>'. Обработчики сигналов увеличивают версию
+области при изменении данных, и все страницы с этой областью сразу
+перестают находиться в кеше, поэтому срок жизни записей может быть
+долгим. Хеш того же ключа служит ETag страницы: если у клиента
+текущая версия, он получает 304 без обращения к кешу и БД.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .metrics import record_cache
+from .replicas import rendered_from_replica
+
+VERSION_KEY_PREFIX = 'version'
+
+
+def version_key(scope):
+    return f'{VERSION_KEY_PREFIX}:{scope}'
+
+
+def _initial_version():
+    # Если версия вытеснена из кеша, новая не должна совпасть со старой,
+    # иначе снова найдутся страницы, закешированные до вытеснения.
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    """Текущие версии областей в порядке scopes"""
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    """Инвалидирует все страницы, зависящие от областей scopes"""
+    for scope in set(scopes):
+        key = version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+
+
+def page_cache_key(request, key_prefix, versions):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    user_id = request.user.pk or 0
+    versions = '.'.join(str(version) for version in versions)
+    return f'page:{key_prefix}:{path}:{user_id}:{versions}'
+
+
+def make_etag(*parts):
+    raw = ':'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def set_conditional_headers(response, etag, last_modified=None):
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_page(state):
+    """
+    Декоратор условного GET для страниц без кеша.
+    state(request, *args, **kwargs) дёшево возвращает (etag, время
+    изменения в секундах или None) или None, если страницы нет.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            current = state(request, *args, **kwargs)
+            if current is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified = current
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = set_conditional_headers(
+                    view(request, *args, **kwargs), etag, last_modified
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_page_versioned(key_prefix, scopes, timeout=None):
+    """
+    Декоратор кеширования страницы.
+    scopes(request, *args, **kwargs) возвращает области, от которых
+    зависит страница. Ключ учитывает пользователя, так как шапка и
+    кнопки подписки у каждого свои.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            versions = get_versions(scopes(request, *args, **kwargs))
+            key = page_cache_key(request, key_prefix, versions)
+            etag = make_etag(key)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+            response = cache.get(key)
+            record_cache(hit=response is not None)
+            if response is not None:
+                return response
+            response = set_conditional_headers(
+                view(request, *args, **kwargs), etag
+            )
+            if response.status_code == 200 and not response.streaming:
+                page_timeout = timeout or settings.PAGE_CACHE_TIMEOUT
+                if rendered_from_replica():
+                    page_timeout = min(
+                        page_timeout, settings.REPLICA_STICKY_SECONDS
+                    )
+                cache.set(key, response, page_timeout)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,130 @@
+"""
+Двухуровневый кеш: память процесса перед общим для воркеров кешем.
+
+Горячие записи читаются из LocMemCache текущего процесса, а источником
+правды остаётся общий бэкенд (файловый кеш, memcached и т.п.), заданный
+отдельным алиасом в CACHES. Ближний уровень держит записи не дольше
+NEAR_TIMEOUT секунд. Ключи с префиксами из NEAR_EXCLUDE_PREFIXES
+(версии областей core.cache) всегда читаются из общего кеша: страницы
+лежат под версионированными ключами и не устаревают, а версии должны
+быть одинаковыми во всех процессах.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+NEAR_TIMEOUT = 5
+NEAR_MAX_ENTRIES = 1000
+MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Параметры:
+    LOCATION - алиас общего кеша в CACHES;
+    OPTIONS['NEAR_TIMEOUT'], OPTIONS['NEAR_MAX_ENTRIES'] - ближний уровень;
+    OPTIONS['NEAR_EXCLUDE_PREFIXES'] - ключи только из общего кеша.
+    Ключи передаются обоим уровням как есть, префиксы и версии
+    добавляет каждый уровень сам.
+    """
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.near_timeout = options.pop('NEAR_TIMEOUT', NEAR_TIMEOUT)
+        near_max_entries = options.pop('NEAR_MAX_ENTRIES', NEAR_MAX_ENTRIES)
+        self.near_exclude = tuple(options.pop('NEAR_EXCLUDE_PREFIXES', ()))
+        super().__init__({**params, 'OPTIONS': options})
+        self._shared_alias = location
+        self.near = LocMemCache(
+            f'two-tier-{location}',
+            {
+                'TIMEOUT': self.near_timeout,
+                'KEY_PREFIX': self.key_prefix,
+                'VERSION': self.version,
+                'OPTIONS': {'MAX_ENTRIES': near_max_entries},
+            },
+        )
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _is_near(self, key):
+        return not key.startswith(self.near_exclude)
+
+    def _near_timeout(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.near_timeout
+        return min(timeout, self.near_timeout)
+
+    def get(self, key, default=None, version=None):
+        if self._is_near(key):
+            value = self.near.get(key, MISSING, version)
+            if value is not MISSING:
+                return value
+        value = self.shared.get(key, MISSING, version)
+        if value is MISSING:
+            return default
+        if self._is_near(key):
+            self.near.set(key, value, self.near_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            if self._is_near(key):
+                value = self.near.get(key, MISSING, version)
+                if value is not MISSING:
+                    found[key] = value
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            for key, value in shared.items():
+                if self._is_near(key):
+                    self.near.set(key, value, self.near_timeout, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        if self._is_near(key):
+            self.near.set(key, value, self._near_timeout(timeout), version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added and self._is_near(key):
+            self.near.set(key, value, self._near_timeout(timeout), version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.near.delete(key, version)
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.near.delete(key, version)
+        self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        self.near.delete_many(keys, version)
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        if self._is_near(key) and self.near.has_key(key, version):
+            return True
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self.near.delete(key, version)
+        return self.shared.incr(key, delta, version)
+
+    def decr(self, key, delta=1, version=None):
+        self.near.delete(key, version)
+        return self.shared.decr(key, delta, version)
+
+    def clear(self):
+        # Ближние уровни других процессов доживут до NEAR_TIMEOUT
+        self.near.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
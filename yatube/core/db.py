@@ -0,0 +1,25 @@
+"""
+Настройка соединений с SQLite.
+
+PRAGMA из SQLITE_PRAGMAS выполняются для каждого нового соединения:
+в режиме WAL читатели не ждут пишущие запросы, synchronous=NORMAL
+не синхронизирует диск на каждом коммите, а busy_timeout заставляет
+писателя подождать блокировку вместо ошибки «database is locked».
+Соединения переиспользуются между запросами через CONN_MAX_AGE,
+поэтому настройка выполняется редко.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection, settings.SQLITE_PRAGMAS)
@@ -0,0 +1,97 @@
+import statistics
+import time
+from copy import deepcopy
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from posts.constants import INDEX_TEMPLATE, INDEX_URL_NAME
+from posts.models import Group, Post, User
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def make_backend(name, cached):
+    params = deepcopy(settings.TEMPLATES[0])
+    params.pop('BACKEND')
+    params['NAME'] = name
+    params['APP_DIRS'] = False
+    params['OPTIONS']['debug'] = False
+    params['OPTIONS']['loaders'] = (
+        [('django.template.loaders.cached.Loader', LOADERS)]
+        if cached else LOADERS
+    )
+    return DjangoTemplates(params)
+
+
+def make_context(posts_count):
+    author = User(pk=1, username='author', first_name='Лев',
+                  last_name='Толстой')
+    group = Group(pk=1, title='Группа', slug='group')
+    posts = [
+        Post(
+            pk=i,
+            text=f'Текст поста {i} ' * 20,
+            author=author,
+            group=group,
+            pub_date=timezone.now(),
+        ) for i in range(1, posts_count + 1)
+    ]
+    return {
+        'title': 'Это главная страница проекта Yatube',
+        'text': 'Последние обновления на сайте',
+        'page_obj': Paginator(posts, posts_count).get_page(1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        f'Сравнивает время рендеринга {INDEX_TEMPLATE} с обычным '
+        'и кеширующим загрузчиком шаблонов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=10)
+
+    def measure(self, backend, context, request, iterations):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend.get_template(INDEX_TEMPLATE).render(context, request)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get(reverse(INDEX_URL_NAME))
+        request.user = AnonymousUser()
+        request.resolver_match = resolve(request.path)
+        context = make_context(options['posts'])
+
+        results = {}
+        for name, cached in (('без кеша', False), ('с кешем', True)):
+            backend = make_backend(f'benchmark_{int(cached)}', cached)
+            # первый рендер прогревает кеш, как warm_up_templates()
+            backend.get_template(INDEX_TEMPLATE).render(context, request)
+            timings = self.measure(
+                backend, context, request, options['iterations']
+            )
+            results[name] = statistics.median(timings)
+            self.stdout.write(
+                f'{name}: медиана {results[name]:.3f} мс, '
+                f'среднее {statistics.mean(timings):.3f} мс, '
+                f'p95 {sorted(timings)[int(len(timings) * 0.95)]:.3f} мс'
+            )
+        speedup = results['без кеша'] / results['с кешем']
+        self.stdout.write(
+            self.style.SUCCESS(f'Ускорение рендеринга: x{speedup:.2f}')
+        )
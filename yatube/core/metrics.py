@@ -0,0 +1,232 @@
+"""
+Метрики стоимости представлений.
+
+MetricsMiddleware для каждого запроса считает число SQL-запросов и
+время в БД, время отрисовки шаблонов (без запросов, выполненных
+из шаблона), попадания в кеш страниц и размер ответа, и складывает
+их по имени представления (posts:index, posts:profile, ...).
+Накопленное отдаёт в формате Prometheus представление core.views.metrics,
+а с METRICS_SERVER_TIMING то же для запроса пишется в заголовок
+Server-Timing. При METRICS_ENABLED=False middleware не подключается,
+а шаблоны и кеш страниц проверяют только thread-local.
+Метрики хранятся в памяти процесса: каждый воркер отдаёт свои.
+Другие приложения добавляют свои показатели через register_collector.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+UNRESOLVED = 'unresolved'
+
+_local = threading.local()
+_collectors = []
+
+
+def register_collector(collector):
+    """collector() возвращает дополнительные строки формата Prometheus"""
+    _collectors.append(collector)
+
+
+class RequestMetrics:
+    """Стоимость одного запроса"""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def render_template(self, render, *args):
+        # Вложенные отрисовки уже входят во внешнюю
+        if self._template_depth:
+            return render(*args)
+        self._template_depth += 1
+        started = time.perf_counter()
+        db_time = self.db_time
+        try:
+            return render(*args)
+        finally:
+            self._template_depth -= 1
+            elapsed = time.perf_counter() - started
+            self.template_time += elapsed - (self.db_time - db_time)
+
+
+def current():
+    """Метрики текущего запроса или None, если они не собираются"""
+    return getattr(_local, 'metrics', None)
+
+
+def record_cache(hit):
+    metrics = current()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_bytes = 0
+
+
+class Registry:
+    """Накопленные метрики по представлениям"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = defaultdict(ViewStats)
+
+    def add(self, view, duration, metrics, response_bytes):
+        with self._lock:
+            stats = self.views[view]
+            stats.requests += 1
+            stats.duration += duration
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[index] += 1
+            stats.db_queries += metrics.db_queries
+            stats.db_time += metrics.db_time
+            stats.template_time += metrics.template_time
+            stats.cache_hits += metrics.cache_hits
+            stats.cache_misses += metrics.cache_misses
+            stats.response_bytes += response_bytes
+
+    def clear(self):
+        with self._lock:
+            self.views.clear()
+
+    def render(self):
+        """Текстовый формат Prometheus"""
+        with self._lock:
+            views = sorted(self.views.items())
+            counters = (
+                ('requests_total', 'Запросов', 'requests'),
+                ('db_queries_total', 'SQL-запросов', 'db_queries'),
+                ('db_seconds_total', 'Время в БД', 'db_time'),
+                ('template_seconds_total', 'Отрисовка шаблонов',
+                 'template_time'),
+                ('cache_hits_total', 'Страниц из кеша', 'cache_hits'),
+                ('cache_misses_total', 'Промахов кеша страниц',
+                 'cache_misses'),
+                ('response_bytes_total', 'Размер ответов', 'response_bytes'),
+            )
+            lines = []
+            for name, description, attr in counters:
+                lines += [
+                    f'# HELP yatube_{name} {description}',
+                    f'# TYPE yatube_{name} counter',
+                ]
+                lines += [
+                    f'yatube_{name}{{view="{view}"}} {getattr(stats, attr)}'
+                    for view, stats in views
+                ]
+            name = 'yatube_request_duration_seconds'
+            lines += [
+                f'# HELP {name} Время ответа',
+                f'# TYPE {name} histogram',
+            ]
+            for view, stats in views:
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    lines.append(
+                        f'{name}_bucket{{view="{view}",le="{bound}"}} {count}'
+                    )
+                lines += [
+                    f'{name}_bucket{{view="{view}",le="+Inf"}} '
+                    f'{stats.requests}',
+                    f'{name}_sum{{view="{view}"}} {stats.duration}',
+                    f'{name}_count{{view="{view}"}} {stats.requests}',
+                ]
+        for collector in _collectors:
+            lines += collector()
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        size = 0 if response.streaming else len(response.content)
+        registry.add(view, duration, metrics, size)
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(duration, metrics)
+        return response
+
+
+def server_timing(duration, metrics):
+    return ', '.join((
+        f'db;dur={metrics.db_time * 1000:.1f};'
+        f'desc="{metrics.db_queries} queries"',
+        f'tpl;dur={metrics.template_time * 1000:.1f}',
+        f'cache;desc="hits={metrics.cache_hits} '
+        f'misses={metrics.cache_misses}"',
+        f'total;dur={duration * 1000:.1f}',
+    ))
+
+
+class MeasuredTemplate(Template):
+
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return super().render(context, request)
+        return metrics.render_template(super().render, context, request)
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """DjangoTemplates, время отрисовки которого попадает в метрики"""
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return MeasuredTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return MeasuredTemplate(template.template, self)
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/xml')
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """
+    Сжимает текстовые ответы не короче GZIP_MIN_LENGTH байт.
+    Потоковые ответы (файлы статики) не трогает: у статики есть
+    заранее сжатые копии.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or len(response.content) < settings.GZIP_MIN_LENGTH
+            or not response.get('Content-Type', '').startswith(
+                COMPRESSIBLE_TYPES
+            )
+        ):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,110 @@
+"""
+Чтение из реплик базы данных.
+
+Представления со списками помечаются декоратором read_from_replica,
+и на время их работы ReplicaRouter отправляет чтение в один из
+алиасов DATABASE_REPLICAS. Запись и чтение в остальных представлениях
+всегда идут в основную базу. Сессия, которая только что писала,
+читает из основной базы ещё REPLICA_STICKY_SECONDS секунд (cookie
+от PrimaryStickinessMiddleware), чтобы видеть свои изменения, пока
+реплика отстаёт. Страницы, собранные из реплики, кешируются только
+на это же время: иначе устаревшая страница могла бы попасть в кеш
+под уже новой версией области.
+"""
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'primary_until'
+
+_state = threading.local()
+
+
+def _current_replica():
+    replica = getattr(_state, 'replica', None)
+    if (
+        replica is None
+        or getattr(_state, 'pinned', False)
+        or getattr(_state, 'wrote', False)
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return None
+    return replica
+
+
+def rendered_from_replica():
+    """Текущее представление читало из реплики"""
+    return getattr(_state, 'used_replica', False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replica = _current_replica()
+        if replica is None:
+            return DEFAULT_DB_ALIAS
+        _state.used_replica = True
+        return replica
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def read_from_replica(view):
+    """
+    Чтение в представлении можно отдать реплике.
+    Реплика выбирается одна на весь запрос, чтобы данные страницы
+    были согласованы между собой.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if settings.DATABASE_REPLICAS:
+            _state.replica = random.choice(settings.DATABASE_REPLICAS)
+        _state.used_replica = False
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+            _state.used_replica = False
+    return wrapper
+
+
+class PrimaryStickinessMiddleware:
+    """Привязывает к основной базе сессию, которая недавно писала"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            primary_until = float(request.COOKIES.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        _state.pinned = primary_until > time.time()
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.pinned = _state.wrote = False
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
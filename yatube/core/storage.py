@@ -0,0 +1,61 @@
+"""
+Хранилище статики для боевого окружения.
+
+collectstatic кладёт файлы с хешем содержимого в имени
+(ManifestStaticFilesStorage) и рядом с текстовыми файлами - их
+сжатые копии .gz и, если установлен пакет brotli, .br. Отдаёт их
+core.views.serve_static, выбирая вариант по Accept-Encoding.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.html', '.json', '.xml',
+)
+# Маленькие файлы почти не сжимаются, а лишний файл занимает место
+MIN_COMPRESS_SIZE = 256
+
+
+def compressors():
+    """Пары (расширение, функция сжатия) для доступных алгоритмов"""
+    variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9))]
+    if brotli is not None:
+        variants.append(('.br', lambda data: brotli.compress(data)))
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """Сохраняет сжатые копии файла, возвращает их имена"""
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return []
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return []
+        saved = []
+        for extension, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            target = name + extension
+            if self.exists(target):
+                self.delete(target)
+            saved.append(self._save(target, ContentFile(compressed)))
+        return saved
@@ -0,0 +1,32 @@
+"""Прогрев кеширующего загрузчика шаблонов при старте процесса"""
+import logging
+import os
+
+from django.conf import settings
+from django.template import engines
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(root):
+    """Имена всех шаблонов каталога root относительно него"""
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            if filename.endswith('.html'):
+                path = os.path.join(directory, filename)
+                yield os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def warm_up_templates():
+    """
+    Компилирует все шаблоны из TEMPLATES_DIR, чтобы первые запросы
+    воркера не разбирали их с диска. Имеет смысл только вместе с
+    django.template.loaders.cached.Loader.
+    """
+    engine = engines['django']
+    loaded = 0
+    for name in template_names(settings.TEMPLATES_DIR):
+        engine.get_template(name)
+        loaded += 1
+    logger.info('Прогрето шаблонов: %s', loaded)
+    return loaded
@@ -0,0 +1,97 @@
+import importlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from yatube import settings as project_settings
+
+SHARED_CACHE_DIR = tempfile.mkdtemp()
+
+TWO_TIER_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'NEAR_EXCLUDE_PREFIXES': ('version:',)},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_CACHE_DIR,
+    },
+}
+
+
+@override_settings(CACHES=TWO_TIER_CACHES)
+class TwoTierCacheTest(SimpleTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SHARED_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['shared']
+
+    def tearDown(self):
+        self.cache.clear()
+
+    def test_values_are_written_through(self):
+        """Запись попадает и в общий кеш, и в память процесса"""
+        self.cache.set('page', 'content')
+        self.assertEqual(self.shared.get('page'), 'content')
+        self.assertEqual(self.cache.near.get('page'), 'content')
+
+        self.cache.delete('page')
+        self.assertIsNone(self.shared.get('page'))
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_near_cache_serves_hot_keys(self):
+        """Повторное чтение берётся из памяти процесса"""
+        self.shared.set('page', 'content')
+        self.assertEqual(self.cache.get('page'), 'content')
+        self.shared.delete('page')
+        self.assertEqual(self.cache.get('page'), 'content')
+
+    def test_excluded_keys_always_read_from_shared(self):
+        """Версии не кешируются в памяти и видны всем процессам"""
+        self.cache.set('version:posts', 1)
+        self.assertIsNone(self.cache.near.get('version:posts'))
+
+        # Другой воркер увеличил версию в общем кеше
+        self.shared.incr('version:posts')
+        self.assertEqual(self.cache.get('version:posts'), 2)
+        self.assertEqual(
+            self.cache.get_many(['version:posts']),
+            {'version:posts': 2},
+        )
+
+
+class SharedCacheSettingsTest(SimpleTestCase):
+
+    def shared_cache(self, backend):
+        environ = {
+            'YATUBE_SHARED_CACHE': '127.0.0.1:11211',
+            'YATUBE_SHARED_CACHE_BACKEND': backend,
+        }
+        try:
+            with mock.patch.dict(os.environ, environ):
+                return importlib.reload(project_settings).CACHES['shared']
+        finally:
+            importlib.reload(project_settings)
+
+    def test_memcached_without_max_entries(self):
+        """Клиенту memcached не передаются параметры кешей Django"""
+        shared = self.shared_cache(
+            'django.core.cache.backends.memcached.MemcachedCache'
+        )
+        self.assertNotIn('OPTIONS', shared)
+
+    def test_filebased_max_entries(self):
+        shared = self.shared_cache(
+            'django.core.cache.backends.filebased.FileBasedCache'
+        )
+        self.assertEqual(shared['OPTIONS'], {'MAX_ENTRIES': 10000})
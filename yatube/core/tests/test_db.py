@@ -0,0 +1,23 @@
+from django.db import connection
+from django.test import TestCase
+
+from core.db import apply_pragmas
+
+
+class SQLitePragmasTest(TestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """Новое соединение настраивается по SQLITE_PRAGMAS"""
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+
+    def test_apply_pragmas(self):
+        apply_pragmas(connection, {'busy_timeout': 1234})
+        self.addCleanup(apply_pragmas, connection, {'busy_timeout': 5000})
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
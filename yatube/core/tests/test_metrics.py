@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+from posts.models import Post, User
+
+
+class MetricsMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='metrics')
+        Post.objects.create(text='Пост для метрик', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    @override_settings(
+        METRICS_ENABLED=True,
+        METRICS_SERVER_TIMING=True,
+        METRICS_TOKEN='secret',
+    )
+    def test_view_cost_recorded(self):
+        """Стоимость запросов копится по имени представления"""
+        client = Client()
+        response = client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        client.get(reverse('posts:index'))
+
+        stats = registry.views['posts:index']
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual((stats.cache_hits, stats.cache_misses), (1, 1))
+        self.assertGreater(stats.db_queries, 0)
+        self.assertGreater(stats.template_time, 0)
+        self.assertEqual(stats.response_bytes, 2 * len(response.content))
+
+        metrics = client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        ).content.decode()
+        self.assertIn('yatube_requests_total{view="posts:index"} 2', metrics)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            metrics,
+        )
+
+    @override_settings(METRICS_ENABLED=True, METRICS_TOKEN='secret')
+    def test_proxied_request_denied(self):
+        """Запрос через локальный прокси без токена метрик не видит"""
+        url = reverse('metrics')
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.client.get(
+                    url,
+                    REMOTE_ADDR='127.0.0.1',
+                    HTTP_X_FORWARDED_FOR='203.0.113.5',
+                    **headers,
+                )
+                self.assertEqual(response.status_code, 404)
+        self.client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.views, {})
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,69 @@
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.replicas import (
+    STICKY_COOKIE,
+    PrimaryStickinessMiddleware,
+    ReplicaRouter,
+    read_from_replica,
+    rendered_from_replica,
+)
+from posts.models import Post
+
+router = ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def reading_view(self, request):
+        self.seen.append(router.db_for_read(Post))
+        self.seen.append(rendered_from_replica())
+        return HttpResponse()
+
+    def writing_view(self, request):
+        self.seen.append(router.db_for_write(Post))
+        self.seen.append(router.db_for_read(Post))
+        return HttpResponse()
+
+    def call(self, view, cookies=None):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies or {})
+        return PrimaryStickinessMiddleware(view)(request)
+
+    def test_marked_view_reads_from_replica(self):
+        """Помеченное представление читает из реплики"""
+        response = self.call(read_from_replica(self.reading_view))
+        self.assertEqual(self.seen, ['replica1', True])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_other_views_read_from_primary(self):
+        self.call(self.reading_view)
+        self.assertEqual(self.seen, ['default', False])
+
+    def test_writes_go_to_primary_and_stick(self):
+        """После записи чтение идёт из default, сессия получает cookie"""
+        response = self.call(read_from_replica(self.writing_view))
+        self.assertEqual(self.seen, ['default', 'default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        self.seen.clear()
+        self.call(
+            read_from_replica(self.reading_view),
+            {STICKY_COOKIE: response.cookies[STICKY_COOKIE].value},
+        )
+        self.assertEqual(self.seen, ['default', False])
+
+    def test_expired_stickiness(self):
+        self.call(
+            read_from_replica(self.reading_view),
+            {STICKY_COOKIE: str(time.time() - 1)},
+        )
+        self.assertEqual(self.seen, ['replica1', True])
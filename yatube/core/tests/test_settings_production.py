@@ -0,0 +1,48 @@
+import copy
+import importlib
+import sys
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from yatube import settings as base_settings
+
+MODULE = 'yatube.settings_production'
+
+
+class ProductionSettingsTest(SimpleTestCase):
+
+    def load(self, shared_cache, databases=None):
+        sys.modules.pop(MODULE, None)
+        # Боевые настройки меняют словари базовых на месте
+        with mock.patch.multiple(
+            base_settings,
+            SHARED_CACHE_LOCATION=shared_cache,
+            DATABASES=copy.deepcopy(databases or base_settings.DATABASES),
+            SQLITE_PRAGMAS=copy.deepcopy(base_settings.SQLITE_PRAGMAS),
+            TEMPLATES=copy.deepcopy(base_settings.TEMPLATES),
+        ):
+            try:
+                return importlib.import_module(MODULE)
+            finally:
+                sys.modules.pop(MODULE, None)
+
+    def test_shared_cache_required(self):
+        """Без общего кеша воркер сбрасывал бы только свой кеш"""
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(None)
+
+    def test_loads_with_shared_cache(self):
+        production = self.load('/var/cache/yatube')
+        self.assertFalse(production.JOBS_EAGER)
+
+    def test_replicas_keep_connections(self):
+        """Соединения реплик живут столько же, сколько основной базы"""
+        default = base_settings.DATABASES['default']
+        production = self.load('/var/cache/yatube', {
+            'default': default,
+            'replica1': {**default, 'NAME': 'replica.sqlite3'},
+        })
+        for database in production.DATABASES.values():
+            self.assertEqual(database['CONN_MAX_AGE'], 600)
@@ -0,0 +1,80 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import ThresholdGZipMiddleware
+from core.views import IMMUTABLE_CACHE_CONTROL, serve_static
+
+CSS = 'body { color: black; }\n' * 100
+
+
+class StaticPipelineTest(SimpleTestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as file:
+            file.write(CSS)
+        settings = override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_hashed_and_compressed_files(self):
+        """collectstatic создаёт файл с хешем и его сжатую копию"""
+        hashed = staticfiles_storage.stored_name('css/site.css')
+        self.assertNotEqual(hashed, 'css/site.css')
+        with open(os.path.join(self.root, hashed + '.gz'), 'rb') as file:
+            self.assertEqual(gzip.decompress(file.read()).decode(), CSS)
+
+    def test_serve_precompressed(self):
+        """Статика отдаётся сжатой и с бессрочным кешированием"""
+        hashed = staticfiles_storage.stored_name('css/site.css')
+        request = RequestFactory().get(
+            '/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        response = serve_static(request, hashed)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        response.close()
+
+        response = serve_static(RequestFactory().get('/'), hashed)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response.close()
+
+
+class ThresholdGZipTest(SimpleTestCase):
+
+    def test_only_large_pages_compressed(self):
+        """Сжимаются только страницы длиннее GZIP_MIN_LENGTH"""
+        factory = RequestFactory()
+        for length, compressed in ((100, False), (5000, True)):
+            with self.subTest(length=length):
+                request = factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+                middleware = ThresholdGZipMiddleware(
+                    lambda request: self.page(length)
+                )
+                response = middleware(request)
+                self.assertEqual(
+                    response.get('Content-Encoding') == 'gzip', compressed
+                )
+
+    @staticmethod
+    def page(length):
+        return HttpResponse('x' * length)
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core.template_warmup import template_names, warm_up_templates
+
+
+class TemplateWarmupTest(SimpleTestCase):
+
+    def test_all_project_templates_compile(self):
+        """Все шаблоны проекта находятся и компилируются при прогреве"""
+        names = set(template_names(settings.TEMPLATES_DIR))
+        self.assertIn('posts/index.html', names)
+        self.assertIn('posts/includes/post_list.html', names)
+        self.assertEqual(warm_up_templates(), len(names))
@@ -1,4 +1,15 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.utils._os import safe_join
+
+from .metrics import registry
 
 
 def page_not_found(request, exception):
@@ -7,3 +18,61 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def has_metrics_token(request):
+    token = settings.METRICS_TOKEN
+    return bool(token) and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics(request):
+    """Метрики представлений в формате Prometheus"""
+    allowed = request.user.is_staff or has_metrics_token(request)
+    if not settings.METRICS_ENABLED or not allowed:
+        raise Http404
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+# Файлы с хешем в имени никогда не меняются
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+STATIC_CACHE_CONTROL = 'public, max-age=3600'
+
+
+def serve_static(request, path):
+    """
+    Отдаёт собранную статику из STATIC_ROOT: заранее сжатую копию,
+    если клиент её принимает, и бессрочные заголовки кеширования
+    для файлов с хешем в имени.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    encoding, file_path = None, full_path
+    for name, extension in STATIC_ENCODINGS:
+        if name in accepted and os.path.isfile(full_path + extension):
+            encoding, file_path = name, full_path + extension
+            break
+    content_type, _ = mimetypes.guess_type(full_path)
+    response = FileResponse(
+        open(file_path, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    if path in hashed_files.values():
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response['Cache-Control'] = STATIC_CACHE_CONTROL
+    return response
@@ -0,0 +1,50 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job, QueuedEmail
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = tuple(
+        field.name for field in Job._meta.fields if field.name != 'id'
+    )
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now()
+        )
+        self.message_user(request, f'Снова в очереди: {updated}')
+    retry.short_description = 'Выполнить ещё раз'
+
+
+class QueuedEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'from_email', 'recipients', 'created', 'sent', 'attempts',
+    )
+    exclude = ('message', 'claim', 'claimed')
+    readonly_fields = (
+        'from_email', 'recipients', 'created', 'sent', 'attempts',
+        'last_error',
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(Job, JobAdmin)
+admin.site.register(QueuedEmail, QueuedEmailAdmin)
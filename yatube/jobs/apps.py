@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+    verbose_name = 'Фоновые задачи'
+
+    def ready(self):
+        from core.metrics import register_collector
+
+        from . import mail, queue
+
+        # Задачи регистрируются декоратором @job в модулях tasks.py
+        autodiscover_modules('tasks')
+        register_collector(queue.metrics)
+        register_collector(mail.metrics)
@@ -0,0 +1,216 @@
+"""
+Отправка почты через очередь фоновых задач.
+
+QueuedEmailBackend (EMAIL_BACKEND) только сохраняет готовое письмо
+в QueuedEmail и ставит задачу отправки, поэтому запрос, например
+сброс пароля, не ждёт почтовый сервер. Задача отправляет до
+EMAIL_QUEUE_BATCH_SIZE писем через одно соединение с бэкендом
+EMAIL_QUEUE_BACKEND (SMTP на сервере, файлы при разработке) и
+ставит себя снова, если письма остались. Пачка сначала захватывается
+условным UPDATE, так что два воркера не отправят одно письмо, а
+каждое отправленное письмо отмечается сразу, вне транзакции задачи:
+сбой посреди пачки не приведёт к повторной отправке уже ушедших.
+Письмо, которое сервер отверг, пропускается и после
+EMAIL_QUEUE_MAX_ATTEMPTS попыток больше не отправляется, чтобы не
+задерживать остальные. Воркер регулярно проверяет очередь (resume),
+так что письма не застрянут и после упавшей задачи отправки.
+Глубина очереди и задержка отправки видны в метриках Prometheus.
+"""
+import json
+import logging
+import smtplib
+import socket
+import uuid
+from datetime import timedelta
+from email import message_from_bytes
+from email.message import Message
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import QueuedEmail
+from .queue import enqueue, job
+
+logger = logging.getLogger(__name__)
+
+FLUSH_KEY = 'send-emails'
+# Почтовый сервер недоступен: письма не виноваты, задача повторится
+CONNECTION_ERRORS = (
+    ConnectionError,
+    socket.timeout,
+    smtplib.SMTPConnectError,
+    smtplib.SMTPServerDisconnected,
+)
+# За какое время, в секундах, считается задержка отправки в метриках
+LATENCY_WINDOW = 5 * 60
+
+
+class StoredMIME(MIMEMixin, Message):
+    """Разобранное сохранённое письмо с as_bytes() как у Django"""
+
+
+class StoredMessage(EmailMessage):
+    """Письмо из очереди: MIME уже собран при постановке"""
+
+    def __init__(self, queued):
+        super().__init__(from_email=queued.from_email)
+        self.queued = queued
+        self.to = json.loads(queued.recipients)
+
+    def recipients(self):
+        return self.to
+
+    def message(self):
+        return message_from_bytes(bytes(self.queued.message), StoredMIME)
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        queued = [
+            QueuedEmail(
+                from_email=message.from_email,
+                recipients=json.dumps(message.recipients()),
+                message=message.message().as_bytes(linesep='\r\n'),
+            )
+            for message in email_messages
+            if message.recipients()
+        ]
+        QueuedEmail.objects.bulk_create(queued)
+        if queued:
+            enqueue(send_emails, key=FLUSH_KEY)
+        return len(queued)
+
+
+@job('jobs.send_emails', atomic=False)
+def send_emails():
+    """Отправляет пачку писем из очереди, остаток - следующей задачей"""
+    if flush():
+        enqueue(send_emails, key=FLUSH_KEY)
+
+
+def claimable():
+    """Неотправленные письма без живого захвата"""
+    # Захват воркера, умершего посреди пачки, со временем истекает
+    stale = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    return QueuedEmail.objects.filter(
+        Q(claimed__isnull=True) | Q(claimed__lt=stale),
+        sent__isnull=True,
+        attempts__lt=settings.EMAIL_QUEUE_MAX_ATTEMPTS,
+    )
+
+
+def resume():
+    """Ставит отправку, если в очереди остались письма"""
+    if claimable().exists():
+        enqueue(send_emails, key=FLUSH_KEY)
+
+
+def claim_batch():
+    """Захватывает пачку писем; возвращает её и признак остатка"""
+    size = settings.EMAIL_QUEUE_BATCH_SIZE
+    candidates = list(
+        claimable().order_by('id').values_list('pk', flat=True)[:size + 1]
+    )
+    candidates, rest = candidates[:size], candidates[size:]
+    claim = uuid.uuid4().hex
+    # Письма, которые успел захватить другой воркер, не обновятся
+    claimable().filter(pk__in=candidates).update(
+        claim=claim, claimed=timezone.now()
+    )
+    batch = list(
+        QueuedEmail.objects.filter(pk__in=candidates, claim=claim)
+        .order_by('id')
+    )
+    return batch, bool(rest)
+
+
+def send_one(connection, queued):
+    """
+    Отправляет письмо и отмечает результат. Письмо, которое сервер
+    отверг, пропускается, после EMAIL_QUEUE_MAX_ATTEMPTS попыток - насовсем.
+    Ошибка соединения прерывает пачку: остальные письма тут ни при чём.
+    """
+    emails = QueuedEmail.objects.filter(pk=queued.pk)
+    try:
+        connection.send_messages([StoredMessage(queued)])
+    except CONNECTION_ERRORS:
+        raise
+    except Exception as error:
+        logger.warning('Письмо %s не отправлено: %r', queued.pk, error)
+        emails.update(
+            attempts=F('attempts') + 1,
+            last_error=repr(error),
+            claim='',
+            claimed=None,
+        )
+    else:
+        emails.update(sent=timezone.now())
+
+
+def flush():
+    """Отправляет одну пачку писем; True, если остались ещё"""
+    batch, remaining = claim_batch()
+    if not batch:
+        return remaining
+    connection = get_connection(settings.EMAIL_QUEUE_BACKEND)
+    unsent = [queued.pk for queued in batch]
+    try:
+        with connection:
+            for queued in batch:
+                send_one(connection, queued)
+                unsent.remove(queued.pk)
+    finally:
+        # Неотправленные письма сразу доступны повтору задачи
+        QueuedEmail.objects.filter(pk__in=unsent).update(
+            claim='', claimed=None
+        )
+    return remaining
+
+
+def purge_sent(days):
+    return QueuedEmail.objects.filter(
+        sent__lt=timezone.now() - timedelta(days=days)
+    ).delete()[0]
+
+
+def metrics():
+    """Строки Prometheus: глубина очереди и задержка отправки"""
+    now = timezone.now()
+    unsent = QueuedEmail.objects.filter(
+        sent__isnull=True,
+        attempts__lt=settings.EMAIL_QUEUE_MAX_ATTEMPTS,
+    )
+    failed = QueuedEmail.objects.filter(
+        sent__isnull=True,
+        attempts__gte=settings.EMAIL_QUEUE_MAX_ATTEMPTS,
+    )
+    oldest = unsent.order_by('id').values_list('created', flat=True).first()
+    latencies = [
+        (sent - created).total_seconds()
+        for created, sent in QueuedEmail.objects.filter(
+            sent__gte=now - timedelta(seconds=LATENCY_WINDOW)
+        ).values_list('created', 'sent')
+    ]
+    average = sum(latencies) / len(latencies) if latencies else 0
+    gauges = (
+        ('queue_depth', 'Писем ждут отправки', unsent.count()),
+        ('failed', 'Писем, которые не удалось отправить', failed.count()),
+        ('queue_oldest_seconds', 'Сколько ждёт самое старое письмо',
+         (now - oldest).total_seconds() if oldest else 0),
+        ('send_latency_avg_seconds', 'Средняя задержка отправки', average),
+        ('send_latency_max_seconds', 'Наибольшая задержка отправки',
+         max(latencies, default=0)),
+    )
+    lines = []
+    for name, description, value in gauges:
+        lines += [
+            f'# HELP yatube_email_{name} {description}',
+            f'# TYPE yatube_email_{name} gauge',
+            f'yatube_email_{name} {value}',
+        ]
+    return lines
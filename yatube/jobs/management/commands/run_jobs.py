@@ -0,0 +1,64 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.mail import purge_sent, resume as resume_mail
+from jobs.queue import purge_done, requeue_stale, run_next
+
+# Как часто, в секундах, искать зависшие и удалять старые задачи
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновых задач: выполняет задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти',
+        )
+        parser.add_argument(
+            '--max-jobs', type=int,
+            help='Выйти после стольких задач',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза, если очередь пуста, секунд',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        processed = 0
+        maintained = 0
+        try:
+            while not self.stopping:
+                if time.monotonic() - maintained > MAINTENANCE_INTERVAL:
+                    requeue_stale()
+                    purge_done()
+                    purge_sent(settings.JOBS_KEEP_DONE_DAYS)
+                    resume_mail()
+                    maintained = time.monotonic()
+                job = run_next()
+                if job is not None:
+                    processed += 1
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'{job}: {job.status}')
+                    if processed == options['max_jobs']:
+                        break
+                    continue
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {processed}'))
+
+    def stop(self, signum, frame):
+        # Текущая задача доработает, новая не начнётся
+        self.stopping = True
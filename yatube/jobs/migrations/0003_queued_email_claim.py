@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_queued_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedemail',
+            name='claim',
+            field=models.CharField(blank=True, max_length=32, verbose_name='Захвачено'),
+        ),
+        migrations.AddField(
+            model_name='queuedemail',
+            name='claimed',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время захвата'),
+        ),
+    ]
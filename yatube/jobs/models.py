@@ -0,0 +1,73 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    args = models.TextField('Аргументы (JSON)', default='[]')
+    key = models.CharField(
+        'Ключ',
+        max_length=200,
+        blank=True,
+        help_text='Задача с тем же ключом не ставится, пока эта в очереди',
+    )
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Предел попыток', default=3
+    )
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    started = models.DateTimeField('Начата', null=True, blank=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'), name='job_status_run_at_idx'
+            ),
+            models.Index(fields=('key', 'status'), name='job_key_idx'),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+
+class QueuedEmail(models.Model):
+    """Письмо, собранное при отправке и ждущее воркера"""
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.TextField('Получатели (JSON)')
+    message = models.BinaryField('Письмо (MIME)')
+    created = models.DateTimeField('Поставлено', auto_now_add=True)
+    sent = models.DateTimeField('Отправлено', null=True, blank=True)
+    # Воркер, который отправляет письмо, и когда он его забрал
+    claim = models.CharField('Захвачено', max_length=32, blank=True)
+    claimed = models.DateTimeField('Время захвата', null=True, blank=True)
+    attempts = models.PositiveIntegerField('Неудачных попыток', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Письма в очереди'
+        indexes = (
+            models.Index(fields=('sent', 'id'), name='email_sent_idx'),
+        )
+
+    def __str__(self):
+        return f'Письмо #{self.pk}'
@@ -0,0 +1,186 @@
+"""
+Очередь фоновых задач в базе данных, без отдельного брокера.
+
+Функции-задачи отмечаются декоратором @job, а enqueue() записывает
+вызов в таблицу Job в той же транзакции, что и изменение, которое
+его породило: задача не потеряется и не выполнится для
+откатившихся данных. Команда run_jobs забирает задачи по одной
+(условным UPDATE, поэтому воркеров может быть несколько), повторяет
+упавшие с растущей задержкой и возвращает в очередь задачи
+воркера, который умер посреди работы. С JOBS_EAGER задачи
+выполняются сразу в enqueue() - для разработки и тестов.
+"""
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+# Сколько задач из начала очереди пробовать захватить за раз
+CLAIM_CANDIDATES = 10
+STALE_ERROR = (
+    'Задача не завершилась за JOBS_STALE_AFTER: воркер, вероятно, '
+    'упал во время её выполнения'
+)
+
+
+class UnknownJob(Exception):
+    pass
+
+
+def job(name=None, max_attempts=3, atomic=True):
+    """
+    Регистрирует функцию как задачу.
+    Аргументы задачи хранятся в JSON, поэтому передавайте id, а не
+    объекты. Задача может выполниться повторно и должна это выдерживать.
+    С atomic=False задача выполняется вне транзакции и сама фиксирует
+    свои изменения - например, отметки о том, что уже сделано снаружи.
+    """
+    def decorator(func):
+        func.job_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        func.atomic = atomic
+        REGISTRY[func.job_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, *args, delay=0, key=''):
+    """Ставит вызов func(*args) в очередь; возвращает Job или None"""
+    # Аргументы проходят через JSON и в синхронном режиме,
+    # чтобы задача вела себя одинаково в обоих
+    payload = json.dumps(args)
+    if settings.JOBS_EAGER:
+        func(*json.loads(payload))
+        return None
+    if key and Job.objects.filter(key=key, status=Job.QUEUED).exists():
+        return None
+    return Job.objects.create(
+        name=func.job_name,
+        args=payload,
+        key=key,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def retry_delay(attempts):
+    return settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def execute(job):
+    """Выполняет захваченную задачу и записывает результат"""
+    started = time.perf_counter()
+    try:
+        func = REGISTRY.get(job.name)
+        if func is None:
+            raise UnknownJob(job.name)
+        if func.atomic:
+            # Упавшая задача не оставляет половину своих изменений
+            with transaction.atomic():
+                func(*json.loads(job.args))
+        else:
+            func(*json.loads(job.args))
+    except Exception:
+        logger.exception('Задача %s упала', job)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished = timezone.now()
+    else:
+        job.status = Job.DONE
+        job.finished = timezone.now()
+        logger.info(
+            'Задача %s выполнена за %.3f с', job,
+            time.perf_counter() - started,
+        )
+    job.save(update_fields=('status', 'run_at', 'finished', 'last_error'))
+    return job
+
+
+def claim_next():
+    """Захватывает первую готовую задачу или возвращает None"""
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).order_by('run_at', 'id').values_list('pk', flat=True)
+    for pk in candidates[:CLAIM_CANDIDATES]:
+        # Другой воркер мог успеть раньше
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run_next():
+    """Выполняет одну готовую задачу; возвращает её или None"""
+    job = claim_next()
+    if job is not None:
+        execute(job)
+    return job
+
+
+def requeue_stale():
+    """
+    Возвращает в очередь задачи, которые выполняются слишком долго.
+    Задача без оставшихся попыток, например уронившая воркер, больше
+    не выполняется, а отмечается упавшей. Возвращает число
+    возвращённых в очередь.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started__lt=now - timedelta(seconds=settings.JOBS_STALE_AFTER),
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        finished=now,
+        last_error=STALE_ERROR,
+    )
+    if failed:
+        logger.error('Зависших задач без попыток: %s', failed)
+    return stale.update(status=Job.QUEUED, run_at=now)
+
+
+def purge_done():
+    """Удаляет давно выполненные задачи"""
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished__lt=timezone.now() - timedelta(
+            days=settings.JOBS_KEEP_DONE_DAYS
+        ),
+    ).delete()[0]
+
+
+def metrics():
+    """Строки Prometheus: число задач по статусам"""
+    counts = dict.fromkeys((status for status, _ in Job.STATUSES), 0)
+    counts.update(
+        Job.objects.order_by().values_list('status').annotate(Count('id'))
+    )
+    lines = [
+        '# HELP yatube_jobs Фоновых задач по статусам',
+        '# TYPE yatube_jobs gauge',
+    ]
+    lines += [
+        f'yatube_jobs{{status="{status}"}} {count}'
+        for status, count in counts.items()
+    ]
+    return lines
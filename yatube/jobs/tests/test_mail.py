@@ -0,0 +1,146 @@
+from io import StringIO
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+from posts.models import User
+
+from ..mail import claim_batch, claimable, flush, resume
+from ..models import Job, QueuedEmail
+
+
+@override_settings(
+    EMAIL_BACKEND='jobs.mail.QueuedEmailBackend',
+    EMAIL_QUEUE_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_QUEUE_BATCH_SIZE=2,
+    JOBS_EAGER=False,
+)
+class QueuedEmailTest(TestCase):
+
+    def test_send_in_batches(self):
+        """Письма копятся в очереди и уходят пачками из воркера"""
+        for number in range(3):
+            send_mail(
+                f'Subject {number}', f'Текст {number}', 'from@example.com',
+                [f'user{number}@example.com'],
+            )
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.count(), 3)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertIn('yatube_email_queue_depth 3', registry.render())
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+        self.assertFalse(QueuedEmail.objects.filter(sent=None).exists())
+        sent = mail.outbox[2]
+        self.assertEqual(sent.recipients(), ['user2@example.com'])
+        message = sent.message()
+        self.assertEqual(message['Subject'], 'Subject 2')
+        self.assertEqual(
+            message.get_payload(decode=True).decode(), 'Текст 2'
+        )
+
+    def test_claimed_batch_skipped(self):
+        """Письма, захваченные другим воркером, не отправляются дважды"""
+        for number in range(3):
+            send_mail('Subject', 'Текст', None, [f'user{number}@example.com'])
+        claimed, remaining = claim_batch()
+        self.assertEqual(len(claimed), 2)
+        self.assertTrue(remaining)
+        flush()
+        self.assertEqual(
+            [sent.recipients() for sent in mail.outbox],
+            [['user2@example.com']],
+        )
+
+    def test_failure_keeps_sent_marks(self):
+        """Сбой посреди пачки не повторяет уже отправленные письма"""
+        for number in range(2):
+            send_mail('Subject', 'Текст', None, [f'user{number}@example.com'])
+        send = EmailBackend.send_messages
+
+        def fail_second(backend, messages):
+            if mail.outbox:
+                raise SMTPServerDisconnected('SMTP недоступен')
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', fail_second):
+            with self.assertRaises(SMTPServerDisconnected):
+                flush()
+        first, second = QueuedEmail.objects.order_by('id')
+        self.assertIsNotNone(first.sent)
+        self.assertIsNone(second.sent)
+        self.assertIsNone(second.claimed)
+        # Ошибка соединения - не вина письма
+        self.assertEqual(second.attempts, 0)
+        flush()
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_QUEUE_MAX_ATTEMPTS=2)
+    def test_rejected_message_skipped(self):
+        """Отвергнутое письмо не задерживает остальные"""
+        for number in range(3):
+            send_mail('Subject', 'Текст', None, [f'user{number}@example.com'])
+        send = EmailBackend.send_messages
+
+        def reject_first(backend, messages):
+            recipients = messages[0].recipients()
+            if recipients == ['user0@example.com']:
+                raise SMTPRecipientsRefused({recipients[0]: (550, b'No')})
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', reject_first):
+            with self.assertLogs('jobs.mail', 'WARNING'):
+                while flush():
+                    pass
+        self.assertEqual(
+            [sent.recipients() for sent in mail.outbox],
+            [['user1@example.com'], ['user2@example.com']],
+        )
+        rejected = QueuedEmail.objects.get(sent=None)
+        self.assertEqual(rejected.attempts, 2)
+        self.assertIn('SMTPRecipientsRefused', rejected.last_error)
+        self.assertFalse(claimable().exists())
+        self.assertIn('yatube_email_failed 1', registry.render())
+
+    def test_resume(self):
+        """Воркер снова ставит отправку, если письма остались в очереди"""
+        send_mail('Subject', 'Текст', None, ['user@example.com'])
+        Job.objects.all().delete()
+        resume()
+        self.assertEqual(Job.objects.get().name, 'jobs.send_emails')
+
+    def test_alternatives_kept(self):
+        """Письмо сохраняется целиком, с HTML-версией"""
+        email = EmailMultiAlternatives(
+            'Subject', 'Текст', 'from@example.com', ['to@example.com']
+        )
+        email.attach_alternative('<p>Текст</p>', 'text/html')
+        email.send()
+        call_command('run_jobs', '--once', stdout=StringIO())
+        parts = mail.outbox[0].message().get_payload()
+        self.assertEqual(
+            [part.get_content_type() for part in parts],
+            ['text/plain', 'text/html'],
+        )
+
+    def test_password_reset_queued(self):
+        """Сброс пароля не ждёт отправки письма"""
+        User.objects.create_user(
+            username='user', email='user@example.com', password='secret'
+        )
+        response = self.client.post(
+            reverse('users:password_reset'),
+            {'email': 'user@example.com'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.count(), 1)
@@ -0,0 +1,150 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+
+from ..models import Job
+from ..queue import (
+    claim_next,
+    enqueue,
+    job,
+    purge_done,
+    requeue_stale,
+    run_next,
+)
+
+calls = []
+
+
+@job('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@job('tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('сбой')
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_DELAY=10)
+class QueueTest(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача выполняется воркером, а не при постановке"""
+        queued = enqueue(record, 'значение')
+        self.assertEqual(calls, [])
+        self.assertEqual(queued.status, Job.QUEUED)
+
+        self.assertEqual(run_next(), queued)
+        self.assertEqual(calls, ['значение'])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.DONE)
+        self.assertEqual(queued.attempts, 1)
+        self.assertIsNone(run_next())
+
+    def test_eager(self):
+        with override_settings(JOBS_EAGER=True):
+            self.assertIsNone(enqueue(record, 1))
+        self.assertEqual(calls, [1])
+        self.assertFalse(Job.objects.exists())
+
+    def test_delay_and_key(self):
+        """Отложенная задача ждёт, задача с тем же ключом не дублируется"""
+        enqueue(record, 1, delay=60, key='one')
+        self.assertIsNone(enqueue(record, 2, key='one'))
+        self.assertIsNone(run_next())
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется с задержкой, затем помечается ошибкой"""
+        queued = enqueue(fail)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_next()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.QUEUED)
+        self.assertIn('сбой', queued.last_error)
+        self.assertGreater(queued.run_at, timezone.now())
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            run_next()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    def test_claim_once(self):
+        """Захваченную задачу не получит другой воркер"""
+        enqueue(record, 1)
+        self.assertIsNotNone(claim_next())
+        self.assertIsNone(claim_next())
+
+    def test_maintenance(self):
+        """Зависшие задачи возвращаются в очередь, старые удаляются"""
+        long_ago = timezone.now() - timedelta(days=30)
+        stale = Job.objects.create(
+            name='tests.record', args='[1]', status=Job.RUNNING,
+            started=long_ago,
+        )
+        Job.objects.create(
+            name='tests.record', status=Job.DONE, finished=long_ago,
+        )
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(purge_done(), 1)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Job.QUEUED)
+
+    def test_stale_without_attempts_failed(self):
+        """Задача, уронившая воркер на последней попытке, не повторяется"""
+        stale = Job.objects.create(
+            name='tests.record', args='[1]', status=Job.RUNNING,
+            started=timezone.now() - timedelta(days=1),
+            attempts=1, max_attempts=1,
+        )
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(requeue_stale(), 0)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, Job.FAILED)
+        self.assertIsNotNone(stale.finished)
+        self.assertIn('JOBS_STALE_AFTER', stale.last_error)
+        self.assertIsNone(claim_next())
+
+    def test_worker_command(self):
+        enqueue(record, 1)
+        enqueue(record, 2)
+        call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertEqual(calls, [1, 2])
+
+
+@override_settings(JOBS_EAGER=False)
+class PostJobsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_side_effects_run_in_worker(self):
+        """Раздача по лентам и письмо о комментарии идут через очередь"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Привет')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('run_jobs', '--once', stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Привет', mail.outbox[0].body)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
@@ -0,0 +1,83 @@
+"""Области версионированного кеша страниц постов (см. core.cache)"""
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from core.cache import bump_versions, get_versions, make_etag
+
+from .models import Comment, Group, Post
+
+POSTS_SCOPE = 'posts'
+GROUPS_SCOPE = 'groups'
+USERS_SCOPE = 'users'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def index_scopes(request):
+    return (POSTS_SCOPE, GROUPS_SCOPE, USERS_SCOPE)
+
+
+def group_posts_scopes(request, slug):
+    return (group_scope(slug), USERS_SCOPE)
+
+
+def profile_scopes(request, username):
+    return (author_scope(username), GROUPS_SCOPE, USERS_SCOPE)
+
+
+def post_detail_state(request, post_id):
+    """
+    ETag и время изменения страницы поста без её отрисовки:
+    одна строка из БД по индексам и версии областей из кеша.
+    """
+    last_comment = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by('-created').values('created')[:1]
+    state = Post.objects.filter(pk=post_id).annotate(
+        last_comment=Subquery(last_comment),
+    ).order_by().values_list(
+        'updated', 'comments_count', 'author__stats__posts_count',
+        'last_comment',
+    ).first()
+    if state is None:
+        return None
+    updated, _, _, last_comment = state
+    last_modified = max(filter(None, (updated, last_comment)))
+    etag = make_etag(
+        request.get_full_path(),
+        request.user.pk,
+        *state,
+        *get_versions((USERS_SCOPE, post_scope(post_id))),
+    )
+    return etag, int(last_modified.timestamp())
+
+
+def invalidate_post_pages(post, *group_ids):
+    """Сбрасывает кеш страниц, на которых виден пост"""
+    slugs = Group.objects.filter(
+        pk__in=[group_id for group_id in group_ids if group_id]
+    ).values_list('slug', flat=True)
+    bump_versions(
+        POSTS_SCOPE,
+        author_scope(post.author.username),
+        post_scope(post.pk),
+        *(group_scope(slug) for slug in slugs)
+    )
+
+
+def invalidate_post_cards(posts):
+    """
+    Сбрасывает кеш карточек постов из queryset posts.
+    Ключ карточки содержит post.updated (шаблон post_list.html).
+    """
+    posts.update(updated=timezone.now())
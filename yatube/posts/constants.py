@@ -15,6 +15,9 @@ USERS_LOGIN_URL_NAME = 'users:login'
 COMMENT_ADD_URL_NAME = 'posts:add_comment'
 FOLLOW_URL_NAME = 'posts:profile_follow'
 UNFOLLOW_URL_NAME = 'posts:profile_unfollow'
+FOLLOW_INDEX_URL_NAME = 'posts:follow_index'
+SEARCH_URL_NAME = 'posts:search'
+POST_COMMENTS_URL_NAME = 'posts:post_comments'
 
 INDEX_TEMPLATE = 'posts/index.html'
 GROUP_LIST_TEMPLATE = 'posts/group_list.html'
@@ -22,4 +25,6 @@ PROFILE_TEMPLATE = 'posts/profile.html'
 POST_CREATE_TEMPLATE = 'posts/post_create.html'
 POST_EDIT_TEMPLATE = 'posts/post_create.html'
 POST_DETAIL_TEMPLATE = 'posts/post_detail.html'
+SEARCH_TEMPLATE = 'posts/search.html'
+COMMENTS_TEMPLATE = 'posts/includes/comments.html'
 TEMPLATE_404 = 'core/404.html'
@@ -0,0 +1,111 @@
+"""
+Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются через F()-выражения в обработчиках сигналов внутри
+транзакции сохранения (см. AtomicSaveMixin), а recount_all()
+пересчитывает их пакетными UPDATE, если значения разошлись.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_user(user_id, field, delta):
+    changed = _change(UserStats.objects.filter(user_id=user_id), field, delta)
+    # Строки счётчиков может не быть (bulk_create, старые данные).
+    # При удалении её не создаём: пользователь может удаляться каскадом.
+    if not changed and delta > 0:
+        recount_user(user_id)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def recount_user(user_id):
+    """Пересчитывает счётчики одного пользователя с нуля"""
+    if not User.objects.filter(pk=user_id).exists():
+        return None
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id
+            ).count(),
+            'following_count': Follow.objects.filter(
+                user_id=user_id
+            ).count(),
+        },
+    )
+    return stats
+
+
+def user_stats(user):
+    """Счётчики пользователя; создаются, если их ещё нет"""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount_user(user.pk)
+
+
+def _count(model, field):
+    """Подзапрос COUNT(*) по внешнему ключу field"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+COUNTERS = (
+    (UserStats, 'posts_count', Post, 'author'),
+    (UserStats, 'followers_count', Follow, 'author'),
+    (UserStats, 'following_count', Follow, 'user'),
+    (Post, 'comments_count', Comment, 'post'),
+    (Group, 'posts_count', Post, 'group'),
+)
+
+
+def recount_all(dry_run=False):
+    """
+    Находит и исправляет разошедшиеся счётчики.
+    Возвращает словарь {'Модель.поле': число исправленных строк}.
+    """
+    if not dry_run:
+        UserStats.objects.bulk_create(
+            (
+                UserStats(user_id=user_id) for user_id in
+                User.objects.filter(stats__isnull=True)
+                .values_list('pk', flat=True).iterator()
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    drift = {}
+    for model, field, source, source_field in COUNTERS:
+        actual = _count(source, source_field)
+        drifted = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        )
+        drift[f'{model.__name__}.{field}'] = drifted.count()
+        if not dry_run:
+            model.objects.update(**{field: actual})
+    return drift
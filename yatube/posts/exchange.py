@@ -0,0 +1,304 @@
+"""
+Выгрузка и загрузка данных Yatube (команды export_data и import_data).
+
+Каждая модель пишется в свой файл JSON Lines или CSV. Строки читаются
+из БД пачками по первичному ключу, а из файла - построчно, поэтому
+память не растёт с размером данных (кроме таблиц соответствия id).
+При загрузке пользователи и группы с уже существующими username и
+slug не создаются заново, остальные строки получают новые id, а
+внешние ключи переводятся на них. Пачки сохраняются bulk_create
+в отдельных транзакциях. Сигналы при этом не срабатывают, поэтому
+после загрузки счётчики, ленты подписок, поисковый индекс и кеш
+страниц пересчитываются целиком.
+"""
+import csv
+import json
+import os
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from core.cache import bump_versions
+
+from .cache import GROUPS_SCOPE, POSTS_SCOPE, USERS_SCOPE
+from .counters import recount_all
+from .media import recount_references
+from .models import Comment, Follow, Group, Post, User
+from .search import get_backend
+from .timeline import add_follow
+
+CHUNK_SIZE = 2000
+
+Table = namedtuple('Table', ('name', 'model', 'fields', 'natural_key'))
+
+# Порядок важен: внешние ключи ссылаются на уже загруженные таблицы
+TABLES = (
+    Table('users', User, (
+        'id', 'username', 'password', 'email', 'first_name', 'last_name',
+        'is_active', 'date_joined',
+    ), 'username'),
+    Table('groups', Group, ('id', 'title', 'slug', 'description'), 'slug'),
+    Table('posts', Post, (
+        'id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+        'image_width', 'image_height',
+    ), None),
+    Table('comments', Comment, (
+        'id', 'post_id', 'author_id', 'text', 'created',
+    ), None),
+    Table('follows', Follow, ('id', 'user_id', 'author_id'), None),
+)
+# На какую таблицу ссылается внешний ключ
+REFERENCES = {
+    'author_id': 'users',
+    'user_id': 'users',
+    'group_id': 'groups',
+    'post_id': 'posts',
+}
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder отбрасывает микросекунды, а они нужны
+        # для порядка постов
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class JSONLines:
+    extension = 'jsonl'
+
+    @staticmethod
+    def write(file, fields, rows):
+        for row in rows:
+            file.write(json.dumps(row, cls=ExportEncoder,
+                                  ensure_ascii=False))
+            file.write('\n')
+
+    @staticmethod
+    def read(file):
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class CSVFormat:
+    extension = 'csv'
+
+    @staticmethod
+    def write(file, fields, rows):
+        writer = csv.DictWriter(file, fields)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+    @staticmethod
+    def read(file):
+        csv.field_size_limit(sys.maxsize)
+        for row in csv.DictReader(file):
+            # В CSV нет null: пустая строка в ссылке или дате - это None
+            yield {
+                name: None if value == '' and name in REFERENCES else value
+                for name, value in row.items()
+            }
+
+
+FORMATS = {'jsonl': JSONLines, 'csv': CSVFormat}
+
+
+def table_path(directory, table, data_format):
+    return os.path.join(directory, f'{table.name}.{data_format.extension}')
+
+
+def iter_rows(table, chunk_size=CHUNK_SIZE):
+    """Строки таблицы пачками по первичному ключу"""
+    last_id = 0
+    while True:
+        rows = list(
+            table.model.objects.filter(pk__gt=last_id)
+            .order_by('pk').values(*table.fields)[:chunk_size]
+        )
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]['id']
+
+
+def export_data(directory, data_format, chunk_size=CHUNK_SIZE,
+                progress=None):
+    """Выгружает все таблицы в directory; возвращает число строк"""
+    os.makedirs(directory, exist_ok=True)
+    totals = {}
+    for table in TABLES:
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                if progress and count % chunk_size == 0:
+                    progress(table.name, count)
+                yield row
+
+        path = table_path(directory, table, data_format)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            data_format.write(
+                file, table.fields, counted(iter_rows(table, chunk_size))
+            )
+        totals[table.name] = count
+        if progress:
+            progress(table.name, count, done=True)
+    return totals
+
+
+@contextmanager
+def keep_dates(model):
+    """Не подменять даты из файла текущим временем (auto_now_add)"""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загрузка таблиц с переводом id на новые"""
+
+    def __init__(self, batch_size=CHUNK_SIZE, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress
+        self.id_maps = {table.name: {} for table in TABLES}
+        self.skipped = {table.name: 0 for table in TABLES}
+        self.first_new_ids = {}
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def convert(self, table, row):
+        """Приводит значения к типам полей и переводит внешние ключи"""
+        values = {}
+        for name in table.fields:
+            value = row.get(name)
+            if name in REFERENCES and value is not None:
+                value = self.id_maps[REFERENCES[name]].get(int(value))
+                if value is None:
+                    return None
+            elif value is not None:
+                field = table.model._meta.get_field(name)
+                # Пустое число из CSV и выгрузок без этой колонки
+                value = (
+                    None if value == '' and field.null
+                    else field.to_python(value)
+                )
+            values[name] = value
+        return values
+
+    def existing_ids(self, table, rows):
+        """id уже существующих строк по естественному ключу"""
+        if table.natural_key is None:
+            return {}
+        keys = [row[table.natural_key] for row in rows]
+        return dict(
+            table.model.objects.filter(
+                **{f'{table.natural_key}__in': keys}
+            ).values_list(table.natural_key, 'pk')
+        )
+
+    def save_batch(self, table, rows, new_id):
+        existing = self.existing_ids(table, rows)
+        objects = []
+        id_map = self.id_maps[table.name]
+        for row in rows:
+            old_id = row.pop('id')
+            key = row.get(table.natural_key) if table.natural_key else None
+            if key in existing:
+                id_map[int(old_id)] = existing[key]
+                continue
+            objects.append(table.model(id=new_id, **row))
+            id_map[int(old_id)] = new_id
+            new_id += 1
+        with transaction.atomic():
+            table.model.objects.bulk_create(
+                objects, ignore_conflicts=table.model is Follow
+            )
+        return new_id
+
+    def load_table(self, table, rows):
+        self.first_new_ids[table.name] = new_id = self.next_id(table.model)
+        loaded = 0
+        batch = []
+        with keep_dates(table.model):
+            for raw in rows:
+                row = self.convert(table, raw)
+                if row is None:
+                    self.skipped[table.name] += 1
+                    continue
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    new_id = self.save_batch(table, batch, new_id)
+                    loaded += len(batch)
+                    batch = []
+                    if self.progress:
+                        self.progress(table.name, loaded)
+            if batch:
+                self.save_batch(table, batch, new_id)
+                loaded += len(batch)
+        self.reset_sequence(table.model)
+        if self.progress:
+            self.progress(table.name, loaded, done=True)
+        return loaded
+
+    @staticmethod
+    def reset_sequence(model):
+        # В PostgreSQL последовательность не знает о явно заданных id
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def rebuild_derived(self):
+        """Пересчитывает то, что обычно обновляют сигналы"""
+        recount_all()
+        # Новые подписки и старые подписки на авторов с новыми постами
+        changed = Q(pk__in=[])
+        if 'follows' in self.first_new_ids:
+            changed |= Q(pk__gte=self.first_new_ids['follows'])
+        if 'posts' in self.first_new_ids:
+            changed |= Q(author__posts__pk__gte=self.first_new_ids['posts'])
+        follows = Follow.objects.filter(changed).distinct().only(
+            'user_id', 'author_id'
+        )
+        for follow in follows.iterator(chunk_size=self.batch_size):
+            add_follow(follow)
+        get_backend().rebuild()
+        recount_references()
+        bump_versions(POSTS_SCOPE, GROUPS_SCOPE, USERS_SCOPE)
+
+
+def import_data(directory, data_format, batch_size=CHUNK_SIZE,
+                progress=None):
+    """Загружает таблицы из directory; возвращает (загружено, пропущено)"""
+    importer = Importer(batch_size, progress)
+    totals = {}
+    for table in TABLES:
+        path = table_path(directory, table, data_format)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8', newline='') as file:
+            totals[table.name] = importer.load_table(
+                table, data_format.read(file)
+            )
+    importer.rebuild_derived()
+    return totals, importer.skipped
@@ -0,0 +1,65 @@
+"""
+Обработка картинок постов при загрузке.
+
+Оригинал поворачивается по EXIF, уменьшается до POSTS_IMAGE_MAX_SIZE
+по большей стороне и перекодируется в POSTS_IMAGE_FORMAT с качеством
+POSTS_IMAGE_QUALITY. Метаданные (EXIF, в том числе геометка) не
+переносятся. JPEG сразу декодируется в уменьшенном масштабе
+(Image.draft), поэтому снимок в десятки мегапикселей не
+разворачивается в памяти целиком, а миниатюры потом строятся из
+небольшого файла. Размеры сохраняются в Post, и шаблонам не нужно
+открывать файл.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+BACKGROUND = (255, 255, 255)
+SAVE_OPTIONS = {
+    'JPEG': {'optimize': True, 'progressive': True},
+    'WEBP': {'method': 6},
+}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def output_format():
+    # Pillow может быть собран без libwebp
+    if settings.POSTS_IMAGE_FORMAT == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return settings.POSTS_IMAGE_FORMAT
+
+
+def flatten(image):
+    """RGB без прозрачности: прозрачные места заливаются фоном"""
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, BACKGROUND)
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process_image(file):
+    """Возвращает (ContentFile с обработанной картинкой, ширина, высота)"""
+    max_size = settings.POSTS_IMAGE_MAX_SIZE
+    file.seek(0)
+    with Image.open(file) as source:
+        source.draft('RGB', (max_size, max_size))
+        image = flatten(ImageOps.exif_transpose(source))
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    image_format = output_format()
+    content = BytesIO()
+    image.save(
+        content,
+        image_format,
+        quality=settings.POSTS_IMAGE_QUALITY,
+        **SAVE_OPTIONS[image_format],
+    )
+    stem = os.path.splitext(os.path.basename(file.name))[0]
+    name = f'{stem}.{EXTENSIONS[image_format]}'
+    width, height = image.size
+    return ContentFile(content.getvalue(), name=name), width, height
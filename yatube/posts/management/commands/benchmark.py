@@ -0,0 +1,237 @@
+"""
+Замеры страниц постов на синтетических данных растущего размера.
+
+Для каждого размера команда создаёт во временном каталоге новую базу,
+заполняет её генератором seed и открывает страницы постов, включая
+глубокие страницы паджинации (последнюю страницу по номеру и страницу
+по курсору в конце списка). Для каждой страницы пишутся перцентили
+времени ответа, число SQL-запросов и пик выделенной памяти. Перед
+каждым запросом кеш очищается, а реплики отключены, чтобы замерялась
+отрисовка из БД.
+Результат сохраняется в JSON, а с --baseline сравнивается с прошлым
+прогоном: рост времени или памяти больше допуска и любой рост числа
+запросов считается регрессией.
+"""
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, reset_queries
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.management.commands.load_test import percentile
+from posts.models import Group, Post, User
+from posts.paginators import NEXT, encode_cursor
+from posts.seeding import DEFAULT_SCALE, seed_data
+
+DEFAULT_SIZES = '1000,10000'
+# Метрики, по которым ищутся регрессии
+TIMINGS = ('p50_ms', 'p95_ms')
+
+
+def dataset_scale(posts):
+    """Размеры остальных таблиц пропорционально числу постов"""
+    return DEFAULT_SCALE._replace(
+        users=max(posts // 20, 10),
+        groups=max(posts // 1000, 3),
+        posts=posts,
+        comments=posts * 2,
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий относительно baseline"""
+    regressions = []
+    for size, pages in results.items():
+        for page, metrics in pages.items():
+            before = baseline.get(size, {}).get(page)
+            if before is None:
+                continue
+            for name in TIMINGS + ('peak_kb',):
+                limit = before[name] * (1 + tolerance)
+                if metrics[name] > limit:
+                    regressions.append(
+                        f'{size}/{page}: {name} {metrics[name]} '
+                        f'> {before[name]}'
+                    )
+            if metrics['queries'] > before['queries']:
+                regressions.append(
+                    f'{size}/{page}: queries {metrics["queries"]} '
+                    f'> {before["queries"]}'
+                )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = 'Замеряет страницы постов на синтетических данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default=DEFAULT_SIZES,
+            help='Числа постов в наборах данных через запятую',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Сколько раз открывать каждую страницу',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Куда сохранить результаты в JSON',
+        )
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост времени и памяти (доля)',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замеры рассчитаны на SQLite')
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes: числа через запятую')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['results']
+
+        results = self.run_sizes(sizes, options)
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': connection.Database.sqlite_version,
+                'repeat': options['repeat'],
+                'seed': options['seed'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(line)
+                raise CommandError(f'Регрессий: {len(regressions)}')
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def run_sizes(self, sizes, options):
+        """Замеры на отдельной временной базе для каждого размера"""
+        database = connections.databases['default']
+        source = database['NAME']
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                with override_settings(
+                    DATABASE_REPLICAS=[],
+                    MEDIA_ROOT=os.path.join(directory, 'media'),
+                ):
+                    for size in sizes:
+                        connection.close()
+                        database['NAME'] = os.path.join(
+                            directory, f'{size}.sqlite3'
+                        )
+                        results[str(size)] = self.run_size(size, options)
+            finally:
+                connection.close()
+                database['NAME'] = source
+        return results
+
+    def run_size(self, size, options):
+        started = time.monotonic()
+        call_command('migrate', verbosity=0, interactive=False)
+        seed_data(dataset_scale(size), options['seed'])
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{size} постов (данные за {time.monotonic() - started:.0f} с)'
+        ))
+        client = Client()
+        client.force_login(
+            User.objects.annotate(
+                follows=Count('follower')
+            ).order_by('-follows').first()
+        )
+        pages = {}
+        for name, url in self.urls():
+            pages[name] = self.measure(client, url, options['repeat'])
+            metrics = pages[name]
+            self.stdout.write(
+                f'  {name:<14} p50 {metrics["p50_ms"]:7.1f} мс  '
+                f'p95 {metrics["p95_ms"]:7.1f} мс  '
+                f'запросов {metrics["queries"]:3}  '
+                f'память {metrics["peak_kb"]:7.0f} КБ'
+            )
+        return pages
+
+    @staticmethod
+    def urls():
+        """Самые тяжёлые экземпляры каждой страницы"""
+        group = Group.objects.order_by('-posts_count').first()
+        author = User.objects.order_by('-stats__posts_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        index = reverse('posts:index')
+        per_page = settings.POSTS_PER_PAGE
+        pages = max(Post.objects.count() - 1, 0) // per_page + 1
+        urls = [
+            ('index', index),
+            ('group_list', reverse('posts:group_list', args=(group.slug,))),
+            ('profile', reverse('posts:profile', args=(author.username,))),
+            ('post_detail', reverse('posts:post_detail', args=(post.pk,))),
+            ('follow_index', reverse('posts:follow_index')),
+            ('index_last', f'{index}?page={pages}'),
+        ]
+        # Курсор перед постом в конце ленты, если постов больше страницы
+        deep = Post.objects.order_by('pub_date', 'id')[
+            per_page:per_page + 1
+        ].first()
+        if deep is not None:
+            cursor = encode_cursor((deep.pub_date, deep.pk + 1), NEXT)
+            urls.append(('index_cursor', f'{index}?cursor={cursor}'))
+        return urls
+
+    @staticmethod
+    def measure(client, url, repeat):
+        client.get(url)
+        cache.clear()
+        # При DEBUG журнал запросов уже заполнен до предела и не растёт
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+        timings = []
+        for _ in range(repeat):
+            cache.clear()
+            started = time.perf_counter()
+            client.get(url)
+            timings.append(time.perf_counter() - started)
+        # tracemalloc замедляет код, поэтому память - отдельным запросом
+        cache.clear()
+        tracemalloc.start()
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 2),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+            'queries': len(queries),
+            'peak_kb': round(peak / 1024, 1),
+        }
@@ -0,0 +1,159 @@
+"""
+Проверка планов запросов страниц со списками постов.
+
+Команда создаёт пример данных внутри транзакции, вызывает
+представления, выполняет EXPLAIN QUERY PLAN для каждого их SELECT
+и откатывает транзакцию. Ошибка, если какой-то запрос обходит таблицу
+целиком, в том числе по индексу (кроме ALLOWED_SCANS), или сортирует
+строки во временном B-дереве.
+Поиск не проверяется: он сортирует найденное по релевантности.
+"""
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import NEXT, PREVIOUS, encode_cursor
+
+TEMP_SORT = 'TEMP B-TREE'
+# Разрешённые обходы таблиц: (начало SQL, начало строки плана). Обход
+# по индексу (SCAN ... USING INDEX) - тоже полный обход, поэтому
+# каждый случай здесь должен быть ограничен или неизбежен
+ALLOWED_SCANS = (
+    # Первая страница общей ленты: индекс по дате читается в порядке
+    # выдачи без условий и без OFFSET, LIMIT останавливает обход
+    (
+        'SELECT "posts_post"."id"',
+        'SCAN posts_post USING INDEX posts_post_pub_date_',
+    ),
+    # Число страниц главной для нумерованной паджинации. Без него
+    # только курсорная паджинация (POSTS_CURSOR_PAGINATION)
+    (
+        'SELECT COUNT(*) AS "__count" FROM "posts_post"',
+        'SCAN posts_post USING COVERING INDEX',
+    ),
+)
+
+
+def bounded(sql):
+    """Запрос без условий и без OFFSET, с LIMIT"""
+    return ' LIMIT ' in sql and ' WHERE ' not in sql and (
+        ' OFFSET ' not in sql
+    )
+
+
+def allowed_scan(detail, sql):
+    for sql_prefix, detail_prefix in ALLOWED_SCANS:
+        if sql.startswith(sql_prefix) and detail.startswith(detail_prefix):
+            return 'COUNT(*)' in sql_prefix or bounded(sql)
+    return False
+
+
+def plan_problems(detail, sql=''):
+    """Что не так в строке плана (или None)"""
+    if TEMP_SORT in detail:
+        return 'временная сортировка'
+    if (
+        detail.startswith('SCAN ')
+        and 'VIRTUAL TABLE' not in detail
+        and not allowed_scan(detail, sql)
+    ):
+        return 'полное сканирование'
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет планы запросов страниц со списками постов: '
+        'без полного сканирования таблиц и временной сортировки'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов поддерживает только SQLite')
+        with transaction.atomic():
+            problems = self.check_views()
+            transaction.set_rollback(True)
+        if problems:
+            raise CommandError(f'Запросов с плохим планом: {problems}')
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы'))
+
+    def sample_urls(self):
+        suffix = uuid.uuid4().hex[:8]
+        author = User.objects.create_user(username=f'plan-author-{suffix}')
+        reader = User.objects.create_user(username=f'plan-reader-{suffix}')
+        group = Group.objects.create(
+            title='План запросов',
+            slug=f'plan-{suffix}',
+            description='Проверка планов запросов',
+        )
+        post = Post.objects.create(text='Пост', author=author, group=group)
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+        Follow.objects.create(user=reader, author=author)
+        # Курсоры сразу перед постом и сразу после него, чтобы страницы
+        # не были пустыми. Проверяются и запросы соседних страниц
+        cursors = [
+            '?cursor=' + encode_cursor((post.pub_date, post.pk + 1), NEXT),
+            '?cursor=' + encode_cursor(
+                (post.pub_date, post.pk - 1), PREVIOUS
+            ),
+        ]
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(group.slug,)),
+            reverse('posts:profile', args=(author.username,)),
+            reverse('posts:post_detail', args=(post.pk,)),
+            reverse('posts:follow_index'),
+        ]
+        comments = reverse('posts:post_comments', args=(post.pk,))
+        comment = Comment.objects.filter(post=post).first()
+        position = (comment.created, comment.pk)
+        comment_cursors = [
+            encode_cursor(position, NEXT),
+            encode_cursor(position, PREVIOUS),
+        ]
+        return reader, urls + [
+            url + cursor
+            for cursor in cursors
+            for url in urls if url != urls[3]
+        ] + [
+            f'{comments}?{order}cursor={cursor}'
+            for cursor in comment_cursors
+            for order in ('', 'order=new&')
+        ]
+
+    def check_views(self):
+        reader, urls = self.sample_urls()
+        factory = RequestFactory()
+        problems = 0
+        for url in urls:
+            request = factory.get(url)
+            request.user = reader
+            request.resolver_match = resolve(request.path)
+            view, args, kwargs = request.resolver_match
+            with CaptureQueriesContext(connection) as queries:
+                view(request, *args, **kwargs)
+            self.stdout.write(self.style.MIGRATE_HEADING(url))
+            for query in queries.captured_queries:
+                if query['sql'].startswith('SELECT'):
+                    problems += self.explain(query['sql'])
+        return problems
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.stdout.write(f'  {sql}')
+        bad = False
+        for detail in plan:
+            problem = plan_problems(detail, sql)
+            if problem:
+                bad = True
+                self.stderr.write(f'    {detail} ({problem})')
+            else:
+                self.stdout.write(f'    {detail}')
+        return int(bad)
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import collect_orphans, recount_references
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает ссылки на картинки постов и удаляет файлы, '
+        'на которые не ссылается ни один пост'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что было бы исправлено и удалено',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        drift = recount_references(dry_run=dry_run)
+        collected = collect_orphans(dry_run=dry_run)
+        if dry_run:
+            self.stdout.write(
+                f'Разошлось счётчиков: {drift}\n'
+                f'Файлов без ссылок: {collected}'
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Исправлено счётчиков: {drift}\n'
+                f'Удалено файлов: {collected}'
+            ))
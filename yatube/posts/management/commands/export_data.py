@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.exchange import CHUNK_SIZE, FORMATS, export_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии и подписки '
+        'в каталог (по файлу на таблицу)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS), default='jsonl',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк читать из БД за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(table, rows, done=False):
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            line = f'{table}: {rows} ({rate:.0f} строк/с)'
+            self.stdout.write(self.style.SUCCESS(line) if done else line)
+
+        totals = export_data(
+            options['directory'],
+            FORMATS[options['format']],
+            options['chunk_size'],
+            progress if options['verbosity'] else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {sum(totals.values())}'
+        ))
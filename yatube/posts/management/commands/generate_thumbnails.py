@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.cache import invalidate_post_cards, invalidate_post_pages
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails
+
+
+def _generate(post):
+    try:
+        created = generate_thumbnails(post)
+        if created:
+            invalidate_post_cards(Post.objects.filter(pk=post.pk))
+            invalidate_post_pages(post, post.group_id)
+        return created
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Число потоков для создания миниатюр',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').select_related('author')
+        created = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for count in pool.map(_generate, posts.iterator()):
+                created += count
+        self.stdout.write(
+            self.style.SUCCESS(f'Создано миниатюр: {created}')
+        )
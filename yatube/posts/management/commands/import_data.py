@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.exchange import CHUNK_SIZE, FORMATS, import_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает данные, выгруженные export_data. Пользователи и группы '
+        'с существующими username и slug не дублируются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS), default='jsonl',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк сохранять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(table, rows, done=False):
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            line = f'{table}: {rows} ({rate:.0f} строк/с)'
+            self.stdout.write(self.style.SUCCESS(line) if done else line)
+
+        totals, skipped = import_data(
+            options['directory'],
+            FORMATS[options['format']],
+            options['batch_size'],
+            progress if options['verbosity'] else None,
+        )
+        for table, rows in skipped.items():
+            if rows:
+                self.stdout.write(self.style.WARNING(
+                    f'{table}: пропущено строк без связанных записей {rows}'
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {sum(totals.values())}'
+        ))
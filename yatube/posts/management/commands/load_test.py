@@ -0,0 +1,239 @@
+"""
+Нагрузочный тест страниц постов с одновременными чтением и записью.
+
+Читатели открывают главную, группу, ленту, профили и посты, писатели
+публикуют посты, комментируют и подписываются. Каждый работает в
+отдельном процессе, чтобы потоки не упирались в GIL, а кеш страниц
+очищается перед каждым запросом, чтобы тот доходил до БД. Тест идёт на копии
+базы во временном каталоге. С --compare он выполняется дважды:
+с настройками SQLite по умолчанию (журнал DELETE, новое соединение
+на каждый запрос) и с SQLITE_PRAGMAS и CONN_MAX_AGE из настроек.
+"""
+import itertools
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+USERS = 10
+POSTS = 200
+DEFAULT_PRAGMAS = {'journal_mode': 'delete', 'synchronous': 'full'}
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_worker(user, actions, deadline, results):
+    """Выполняет actions по кругу до deadline в дочернем процессе"""
+    timings = []
+    errors = 0
+    client = Client()
+    client.force_login(user)
+    for action in itertools.cycle(actions):
+        if time.monotonic() >= deadline:
+            break
+        # Кеш страниц не должен отвечать вместо БД
+        cache.clear()
+        started = time.perf_counter()
+        try:
+            status = action(client).status_code
+        except Exception:
+            status = 500
+        if status >= 400:
+            errors += 1
+        else:
+            timings.append(time.perf_counter() - started)
+    connections.close_all()
+    results.put((timings, errors))
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест страниц постов с чтением и записью'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность одного прогона, секунд',
+        )
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Сначала прогон с настройками SQLite по умолчанию',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Нагрузочный тест рассчитан на SQLite')
+        database = connections.databases['default']
+        source = database['NAME']
+        if not os.path.exists(source):
+            raise CommandError(f'Нет файла базы {source}, выполните migrate')
+        conn_max_age = database['CONN_MAX_AGE']
+        profiles = [('tuned', settings.SQLITE_PRAGMAS, conn_max_age)]
+        if options['compare']:
+            profiles.insert(0, ('default', DEFAULT_PRAGMAS, 0))
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                for name, pragmas, max_age in profiles:
+                    path = os.path.join(directory, f'{name}.sqlite3')
+                    self.copy_database(source, path)
+                    connection.close()
+                    database['NAME'] = path
+                    database['CONN_MAX_AGE'] = max_age
+                    with override_settings(SQLITE_PRAGMAS=pragmas):
+                        results[name] = self.run_profile(options)
+                        connection.close()
+                    self.report(name, results[name])
+            finally:
+                database['NAME'] = source
+                database['CONN_MAX_AGE'] = conn_max_age
+                connection.close()
+
+        if 'default' in results:
+            for kind in ('reads', 'writes'):
+                before = results['default'][kind][0]
+                after = results['tuned'][kind][0]
+                self.stdout.write(self.style.SUCCESS(
+                    f'{kind}: {after / max(before, 0.1):.2f}x '
+                    f'к настройкам по умолчанию'
+                ))
+
+    @staticmethod
+    def copy_database(source, path):
+        origin = sqlite3.connect(source)
+        target = sqlite3.connect(path)
+        origin.backup(target)
+        target.close()
+        origin.close()
+
+    def prepare_data(self):
+        users = [
+            User.objects.get_or_create(username=f'load-test-{number}')[0]
+            for number in range(USERS)
+        ]
+        group, _ = Group.objects.get_or_create(
+            slug='load-test',
+            defaults={'title': 'Нагрузка', 'description': 'Нагрузочный тест'},
+        )
+        missing = POSTS - Post.objects.count()
+        for number in range(max(missing, 0)):
+            Post.objects.create(
+                text=f'Пост нагрузочного теста {number}',
+                author=random.choice(users),
+                group=group,
+            )
+        return users, group
+
+    def read_actions(self, users, group):
+        post_ids = Post.objects.values_list('pk', flat=True)[:POSTS]
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(group.slug,)),
+            reverse('posts:follow_index'),
+        ] + [
+            reverse('posts:profile', args=(user.username,))
+            for user in users
+        ] + [
+            reverse('posts:post_detail', args=(post_id,))
+            for post_id in post_ids
+        ]
+        random.shuffle(urls)
+        return [lambda client, url=url: client.get(url) for url in urls]
+
+    def write_actions(self, user, users, group):
+        post_id = Post.objects.values_list('pk', flat=True).first()
+        create_url = reverse('posts:post_create')
+        comment_url = reverse('posts:add_comment', args=(post_id,))
+        actions = [
+            lambda client: client.post(
+                create_url, {'text': 'Новый пост', 'group': group.pk}
+            ),
+            lambda client: client.post(comment_url, {'text': 'Комментарий'}),
+        ]
+        for author in users:
+            if author == user:
+                continue
+            actions += [
+                lambda client, name=author.username: client.get(
+                    reverse('posts:profile_follow', args=(name,))
+                ),
+                lambda client, name=author.username: client.get(
+                    reverse('posts:profile_unfollow', args=(name,))
+                ),
+            ]
+        return actions
+
+    def run_profile(self, options):
+        random.seed(0)
+        users, group = self.prepare_data()
+        reads = self.read_actions(users, group)
+        workers = [
+            ('reads', users[number % USERS], reads[number:] + reads[:number])
+            for number in range(options['readers'])
+        ] + [
+            (
+                'writes',
+                users[number % USERS],
+                self.write_actions(users[number % USERS], users, group),
+            )
+            for number in range(options['writers'])
+        ]
+        # Дочерние процессы не должны унаследовать открытое соединение
+        connection.close()
+
+        context = multiprocessing.get_context('fork')
+        started = time.monotonic()
+        deadline = started + options['duration']
+        processes = []
+        for kind, user, actions in workers:
+            queue = context.Queue()
+            process = context.Process(
+                target=run_worker, args=(user, actions, deadline, queue)
+            )
+            process.start()
+            processes.append((kind, process, queue))
+
+        collected = {'reads': ([], 0), 'writes': ([], 0)}
+        for kind, process, queue in processes:
+            timings, errors = queue.get()
+            process.join()
+            total, total_errors = collected[kind]
+            collected[kind] = (total + timings, total_errors + errors)
+        elapsed = time.monotonic() - started
+        return {
+            kind: (
+                len(timings) / elapsed,
+                percentile(timings, 0.5) * 1000,
+                percentile(timings, 0.95) * 1000,
+                errors,
+            )
+            for kind, (timings, errors) in collected.items()
+        }
+
+    def report(self, name, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for kind, (rate, median, p95, errors) in result.items():
+            self.stdout.write(
+                f'  {kind}: {rate:.1f} запр/с, p50 {median:.1f} мс, '
+                f'p95 {p95:.1f} мс, ошибок {errors}'
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько счётчиков разошлось',
+        )
+
+    def handle(self, *args, **options):
+        drift = recount_all(dry_run=options['dry_run'])
+        for counter, rows in drift.items():
+            self.stdout.write(f'{counter}: {rows}')
+        total = sum(drift.values())
+        if options['dry_run']:
+            self.stdout.write(f'Разошлось счётчиков: {total}')
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'Исправлено счётчиков: {total}')
+            )
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.exchange import CHUNK_SIZE
+from posts.seeding import DEFAULT_SCALE, seed_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=DEFAULT_SCALE.users)
+        parser.add_argument(
+            '--groups', type=int, default=DEFAULT_SCALE.groups,
+        )
+        parser.add_argument('--posts', type=int, default=DEFAULT_SCALE.posts)
+        parser.add_argument(
+            '--comments', type=int, default=DEFAULT_SCALE.comments,
+        )
+        parser.add_argument(
+            '--follows', type=int, default=DEFAULT_SCALE.follows,
+            help='Среднее число подписок пользователя',
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=DEFAULT_SCALE.image_share,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument(
+            '--days', type=int, default=DEFAULT_SCALE.days,
+            help='За сколько дней до сегодня распределить посты',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Одинаковый seed даёт одинаковые данные',
+        )
+        parser.add_argument('--batch-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        scale = DEFAULT_SCALE._replace(**{
+            field: options[field] for field in DEFAULT_SCALE._fields
+        })
+        started = time.monotonic()
+
+        def progress(table, rows, done=False):
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            line = f'{table}: {rows} ({rate:.0f} строк/с)'
+            self.stdout.write(self.style.SUCCESS(line) if done else line)
+
+        totals = seed_data(
+            scale,
+            options['seed'],
+            options['batch_size'],
+            progress if options['verbosity'] else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {sum(totals.values())}'
+        ))
+        if scale.image_share:
+            self.stdout.write(
+                'Миниатюры картинок создаёт команда generate_thumbnails'
+            )
@@ -0,0 +1,200 @@
+"""
+Счётчики ссылок на файлы картинок постов и удаление файлов без ссылок.
+
+Картинки лежат в хранилище по хешу содержимого (posts.storage), и на
+один файл могут ссылаться несколько постов. Обработчики сигналов
+постов увеличивают счётчик MediaFile при новой картинке и уменьшают
+при удалении поста или замене картинки. Файл без ссылок удаляет
+фоновая задача через MEDIA_GC_GRACE секунд вместе с миниатюрами.
+Свежие файлы не удаляются: это даёт записать ссылку загрузке, которая
+совпала с файлом, уже ожидающим удаления; задача откладывается до
+конца этого срока. С JOBS_EAGER отложить задачу некому, поэтому
+сразу удаляются только старые файлы, а свежие остаются до запуска
+collect_media. Эта же команда исправляет расхождения счётчиков и
+файлы, оставшиеся после сбоев, и её стоит запускать по расписанию.
+"""
+import logging
+import math
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import enqueue, job
+
+from .models import MediaFile, Post
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def image_storage():
+    return Post._meta.get_field('image').storage
+
+
+def acquire(name):
+    """Новая ссылка на файл name"""
+    if not name:
+        return
+    media, created = MediaFile.objects.get_or_create(
+        name=name, defaults={'references': 1}
+    )
+    if not created:
+        MediaFile.objects.filter(pk=media.pk).update(
+            references=F('references') + 1
+        )
+
+
+def release(name):
+    """Убирает ссылку; файл без ссылок удаляется после коммита"""
+    if not name:
+        return
+    MediaFile.objects.filter(name=name, references__gt=0).update(
+        references=F('references') - 1
+    )
+    if MediaFile.objects.filter(name=name, references=0).exists():
+        transaction.on_commit(lambda: enqueue(
+            collect, name, delay=settings.MEDIA_GC_GRACE,
+        ))
+
+
+def grace_left(storage, name):
+    """Сколько секунд файл ещё нельзя удалять (MEDIA_GC_GRACE)"""
+    try:
+        modified = storage.get_modified_time(name)
+    except OSError:
+        return 0
+    grace = timedelta(seconds=settings.MEDIA_GC_GRACE)
+    return max((modified + grace - timezone.now()).total_seconds(), 0)
+
+
+def delete_file(storage, name):
+    """Удаляет файл с его миниатюрами"""
+    # Удаляет и записи sorl о миниатюрах, и их файлы
+    default.kvstore.delete(ImageFile(name, storage))
+    storage.delete(name)
+
+
+@job('posts.collect_media')
+def collect(name):
+    """Удаляет файл, если на него так и не появилось ссылок"""
+    storage = image_storage()
+    try:
+        delay = grace_left(storage, name)
+    except SuspiciousFileOperation:
+        # Путь вне хранилища, заданный вручную, не удаляется
+        MediaFile.objects.filter(name=name, references=0).delete()
+        return False
+    if not delay:
+        with transaction.atomic():
+            deleted, _ = MediaFile.objects.filter(
+                name=name, references=0
+            ).delete()
+            if not deleted:
+                return False
+            # Загрузка того же содержимого обновляет время файла до
+            # записи ссылки. Если это случилось после первой проверки,
+            # запись возвращается, а файл остаётся
+            delay = grace_left(storage, name)
+            if delay:
+                transaction.set_rollback(True)
+    if delay:
+        # Файл недавно использовали. Без воркера отложить задачу
+        # нельзя, и файл остаётся команде collect_media
+        if not settings.JOBS_EAGER:
+            enqueue(collect, name, delay=math.ceil(delay))
+        return False
+    delete_file(storage, name)
+    return True
+
+
+def recount_references(dry_run=False):
+    """
+    Сверяет счётчики ссылок с постами.
+    Возвращает число исправленных записей MediaFile.
+    """
+    actual = dict(
+        Post.objects.exclude(image='').order_by()
+        .values('image').annotate(total=Count('pk'))
+        .values_list('image', 'total')
+    )
+    drifted = []
+    for media in MediaFile.objects.iterator():
+        total = actual.pop(media.name, 0)
+        if media.references != total:
+            media.references = total
+            drifted.append(media)
+    missing = [
+        MediaFile(name=name, references=total)
+        for name, total in actual.items()
+    ]
+    if not dry_run:
+        MediaFile.objects.bulk_update(
+            drifted, ('references',), batch_size=BATCH_SIZE
+        )
+        MediaFile.objects.bulk_create(
+            missing, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+    return len(drifted) + len(missing)
+
+
+def stored_files(storage, directory):
+    """Все файлы каталога хранилища, включая подкаталоги"""
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from stored_files(
+            storage, posixpath.join(directory, subdirectory)
+        )
+
+
+def orphans(storage):
+    """Файлы картинок, на которые не ссылается ни один пост"""
+    batch = []
+    for name in stored_files(storage, settings.POSTS_MEDIA_ROOT.rstrip('/')):
+        batch.append(name)
+        if len(batch) == BATCH_SIZE:
+            yield from unreferenced(batch)
+            batch = []
+    yield from unreferenced(batch)
+
+
+def unreferenced(names):
+    referenced = set(
+        MediaFile.objects.filter(
+            name__in=names, references__gt=0
+        ).values_list('name', flat=True)
+    )
+    return [name for name in names if name not in referenced]
+
+
+def collect_orphans(dry_run=False):
+    """
+    Удаляет файлы картинок без ссылок старше MEDIA_GC_GRACE.
+    Возвращает их число. Счётчики должны быть пересчитаны заранее.
+    """
+    storage = image_storage()
+    collected = 0
+    for name in orphans(storage):
+        if grace_left(storage, name):
+            continue
+        collected += 1
+        if not dry_run:
+            MediaFile.objects.filter(name=name, references=0).delete()
+            delete_file(storage, name)
+            logger.info('Удалён файл без ссылок %s', name)
+    if not dry_run:
+        # Записи о файлах, которых уже нет на диске. Новая ссылка на
+        # свежий файл создаст запись заново
+        MediaFile.objects.filter(references=0).delete()
+    return collected
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:32
+
+from django.db import migrations, models
+from PIL import Image
+
+
+def fill_image_size(apps, schema_editor):
+    # Уже загруженные картинки не перекодируются, только читаются
+    # заголовки файлов; отсутствующие и битые файлы пропускаются
+    Post = apps.get_model('posts', 'Post')
+    posts = []
+    for post in Post.objects.exclude(image='').only('image').iterator():
+        try:
+            with post.image.open('rb') as file, Image.open(file) as image:
+                post.image_width, post.image_height = image.size
+        except (OSError, ValueError):
+            continue
+        posts.append(post)
+    Post.objects.bulk_update(
+        posts, ('image_width', 'image_height'), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(fill_image_size, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,33 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
 from yatube.settings import POSTS_MEDIA_ROOT
 
+from .images import process_image
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
+class AtomicSaveMixin:
+    """
+    Сохраняет запись в одной транзакции с обработчиками post_save,
+    чтобы счётчики не расходились с данными при ошибке.
+    """
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
 class Group(models.Model):
     title = models.CharField('Название сообщества', max_length=200)
     slug = models.SlugField('Идентификатор сообщества в URL', unique=True)
     description = models.TextField('Описание сообщества')
+    posts_count = models.PositiveIntegerField(
+        'Количество постов',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Сообщество'
@@ -19,7 +37,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class Post(AtomicSaveMixin, models.Model):
     text = models.TextField('Содержание поста', blank=True, null=True)
     pub_date = models.DateTimeField(
         'Дата публикации',
@@ -44,19 +62,64 @@ class Post(models.Model):
     image = models.ImageField(
         'Изображение',
         upload_to=POSTS_MEDIA_ROOT,
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Заполняются при загрузке (posts.images), а не через width_field:
+    # тот читал бы файл при создании каждого объекта без размеров
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        help_text='Версия кешированной карточки поста',
+    )
 
     class Meta:
         verbose_name = 'Пост (публикация)'
         verbose_name_plural = 'Посты (публикации)'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Только что загруженный файл ещё не сохранён в хранилище
+        if self.image and not self.image._committed:
+            self.image, self.image_width, self.image_height = (
+                process_image(self.image)
+            )
+        elif not self.image:
+            self.image_width = self.image_height = None
+        super().save(*args, **kwargs)
+
 
-class Comment(models.Model):
+class Comment(AtomicSaveMixin, models.Model):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -80,9 +143,16 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created'),
+                name='comment_post_created_idx',
+            ),
+        )
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -103,5 +173,89 @@ class Follow(models.Model):
             models.UniqueConstraint(
                 fields=('user', 'author'),
                 name='unique_follow',
-            )
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx',
+            ),
+        )
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые обновляются вместе с данными"""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Ленты подписок'
+        ordering = ('-pub_date',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='timeline_user_author_idx',
+            ),
         )
+
+
+class MediaFile(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются"""
+    name = models.CharField('Путь к файлу', max_length=255, unique=True)
+    references = models.PositiveIntegerField('Ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
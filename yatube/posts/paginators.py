@@ -0,0 +1,171 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(position, direction):
+    """Упаковывает позицию (дата, id) в непрозрачный токен"""
+    date, pk = position
+    raw = f'{direction}|{date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора в направление и позицию"""
+    padding = '=' * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        direction, date, pk = raw.split('|')
+        position = (parse_datetime(date), int(pk))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREVIOUS) or position[0] is None:
+        raise InvalidCursor(token)
+    return direction, position
+
+
+class CursorPage(Sequence):
+    """
+    Страница курсорного паджинатора.
+    Повторяет интерфейс django.core.paginator.Page, который нужен
+    шаблону includes/paginator.html, но не знает общего числа записей.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+        # Позиции запоминаются сразу: object_list можно заменить,
+        # например строки ленты на их посты
+        self._first = self._last = None
+        if object_list:
+            self._first = paginator.position(object_list[0])
+            self._last = paginator.position(object_list[-1])
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self.has_next() or self._last is None:
+            return None
+        return encode_cursor(self._last, NEXT)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous() or self._first is None:
+            return None
+        return encode_cursor(self._first, PREVIOUS)
+
+
+class CursorPaginator:
+    """
+    Паджинация по ключу (дата, id) без COUNT(*) и OFFSET.
+    Записи отдаются от новых к старым (descending=False - от старых
+    к новым), страница строится одним запросом по индексу, поэтому
+    новые записи не сдвигают выдачу.
+    fields - поля ключа, по ним же должен идти индекс.
+    """
+    def __init__(self, object_list, per_page, fields=('pub_date', 'id'),
+                 descending=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.fields = fields
+        self.descending = descending
+        sign = '-' if descending else ''
+        self.ordering = tuple(f'{sign}{field}' for field in fields)
+
+    def position(self, obj):
+        return tuple(getattr(obj, field) for field in self.fields)
+
+    def _beyond(self, position, backwards, inclusive=False):
+        # Условие по первому полю - диапазон, чтобы SQLite прошёл
+        # индекс по порядку и не сортировал объединение OR.
+        # Отрицать всё условие нельзя: NOT от диапазона - полный обход
+        date_field, id_field = self.fields
+        date, pk = position
+        before, after = ('lte', 'gte') if backwards else ('gte', 'lte')
+        if inclusive:
+            after = after[:2]
+        return Q(**{f'{date_field}__{before}': date}) & ~Q(
+            **{date_field: date, f'{id_field}__{after}': pk}
+        )
+
+    def _after(self, position, inclusive=False):
+        """Записи после position в порядке выдачи"""
+        return self._beyond(position, self.descending, inclusive)
+
+    def _before(self, position, inclusive=False):
+        return self._beyond(position, not self.descending, inclusive)
+
+    def page(self, cursor=None):
+        """Возвращает страницу по токену курсора (None - первая страница)"""
+        queryset = self.object_list.order_by(*self.ordering)
+        if not cursor:
+            items = list(queryset[:self.per_page + 1])
+            return CursorPage(
+                items[:self.per_page], self,
+                has_next=len(items) > self.per_page,
+                has_previous=False,
+            )
+
+        direction, position = decode_cursor(cursor)
+        if direction == NEXT:
+            items = list(
+                queryset.filter(self._after(position))
+                [:self.per_page + 1]
+            )
+            has_next = len(items) > self.per_page
+            items = items[:self.per_page]
+            has_previous = queryset.filter(
+                self._before(position, inclusive=True)
+            ).exists()
+        else:
+            reverse_ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in self.ordering
+            ]
+            items = list(
+                queryset.filter(self._before(position))
+                .order_by(*reverse_ordering)[:self.per_page + 1]
+            )
+            has_previous = len(items) > self.per_page
+            items = items[:self.per_page][::-1]
+            has_next = queryset.filter(
+                self._after(position, inclusive=True)
+            ).exists()
+        return CursorPage(items, self, has_next, has_previous)
+
+    def get_page(self, cursor=None):
+        """Как page(), но при битом курсоре отдаёт первую страницу"""
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
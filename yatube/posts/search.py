@@ -0,0 +1,129 @@
+"""
+Полнотекстовый поиск по постам.
+
+Бэкенд задаётся настройкой SEARCH_BACKEND. SQLiteFTSBackend хранит
+основы слов (posts.stemmer) в виртуальной таблице FTS5 и ранжирует
+результаты по bm25; SimpleSearchBackend - запасной вариант для других
+СУБД без отдельного индекса. Индекс обновляется сигналами при
+сохранении и удалении поста, а команда rebuild_search_index
+перестраивает его целиком.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemmer import WORD, stems
+
+FTS_TABLE = 'posts_post_fts'
+REBUILD_BATCH_SIZE = 1000
+
+
+class BaseSearchBackend:
+
+    def is_available(self):
+        return True
+
+    def index(self, post):
+        """Добавляет или обновляет пост в индексе"""
+
+    def remove(self, post_id):
+        """Убирает пост из индекса"""
+
+    def rebuild(self):
+        """Перестраивает индекс; возвращает число проиндексированных"""
+        return 0
+
+    def search(self, query, limit):
+        """id подходящих постов, от самых релевантных"""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+
+    def is_available(self):
+        return connection.vendor == 'sqlite'
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(stems(post.text))],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        indexed = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            rows = []
+            posts = Post.objects.order_by().values_list('pk', 'text')
+            for pk, text in posts.iterator(chunk_size=REBUILD_BATCH_SIZE):
+                rows.append((pk, ' '.join(stems(text))))
+                if len(rows) == REBUILD_BATCH_SIZE:
+                    self._insert(cursor, rows)
+                    indexed += len(rows)
+                    rows = []
+            self._insert(cursor, rows)
+        return indexed + len(rows)
+
+    @staticmethod
+    def _insert(cursor, rows):
+        if rows:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                rows,
+            )
+
+    def search(self, query, limit):
+        terms = ' '.join(f'"{term}"*' for term in stems(query))
+        if not terms:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}) LIMIT %s',
+                [terms, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Поиск подстрокой по всем словам запроса, новые посты выше"""
+
+    def search(self, query, limit):
+        words = WORD.findall(query)
+        if not words:
+            return []
+        condition = Q()
+        for word in words:
+            condition &= Q(text__icontains=word)
+        return list(
+            Post.objects.filter(condition)
+            .order_by('-pub_date')
+            .values_list('pk', flat=True)[:limit]
+        )
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    backend = import_string(settings.SEARCH_BACKEND)()
+    if not backend.is_available():
+        backend = SimpleSearchBackend()
+    return backend
+
+
+def search_post_ids(query, limit=None):
+    """id найденных постов, не больше SEARCH_MAX_RESULTS"""
+    return get_backend().search(query, limit or settings.SEARCH_MAX_RESULTS)
@@ -0,0 +1,207 @@
+"""
+Синтетические данные для локальной проверки производительности.
+
+Генератор строит строки пользователей, групп, постов, комментариев и
+подписок и сохраняет их через exchange.Importer, то есть пачками
+bulk_create с пересчётом производных данных в конце. Популярность
+авторов и групп распределена по степенному закону: немногие авторы
+собирают большую часть подписчиков и пишут большую часть постов, как
+на живом сайте. Один и тот же seed даёт те же данные (даты
+отсчитываются от начала текущего дня).
+"""
+import random
+from collections import namedtuple
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from .exchange import CHUNK_SIZE, TABLES, Importer
+from .media import image_storage
+
+PASSWORD = 'yatube-seed'
+FOLLOWS_PARETO_ALPHA = 1.2
+PARETO_MEAN = FOLLOWS_PARETO_ALPHA / (FOLLOWS_PARETO_ALPHA - 1)
+POPULARITY_EXPONENT = 1.1
+IMAGE_SIZE = (960, 640)
+
+Scale = namedtuple('Scale', (
+    'users', 'groups', 'posts', 'comments', 'follows', 'image_share',
+    'days',
+))
+DEFAULT_SCALE = Scale(
+    users=1000, groups=20, posts=20000, comments=50000, follows=20,
+    image_share=0.1, days=365,
+)
+
+
+class Seeder:
+    """Строки синтетических данных с id от 1"""
+
+    def __init__(self, scale, seed=0):
+        self.scale = scale
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.until = timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.since = self.until - timedelta(days=scale.days)
+        # Вес i-го по популярности автора или группы ~ 1 / i^s
+        self.author_weights = list(accumulate(
+            1 / rank ** POPULARITY_EXPONENT
+            for rank in range(1, scale.users + 1)
+        ))
+        self.group_weights = list(accumulate(
+            1 / rank ** POPULARITY_EXPONENT
+            for rank in range(1, scale.groups + 1)
+        ))
+        self.images = []
+
+    def pick(self, cumulative_weights):
+        """Номер от 1 с вероятностью по весам"""
+        return self.random.choices(
+            range(1, len(cumulative_weights) + 1),
+            cum_weights=cumulative_weights,
+        )[0]
+
+    def post_date(self, post_id):
+        # Посты идут по времени в порядке id
+        span = (self.until - self.since) / max(self.scale.posts, 1)
+        return self.since + span * (post_id - 1)
+
+    def users(self):
+        password = make_password(PASSWORD, salt=f'yatubeseed{self.seed}')
+        for user_id in range(1, self.scale.users + 1):
+            yield {
+                'id': user_id,
+                'username': f'{self.fake.user_name()}_{self.seed}_{user_id}',
+                'password': password,
+                'email': self.fake.email(),
+                'first_name': self.fake.first_name(),
+                'last_name': self.fake.last_name(),
+                'is_active': True,
+                'date_joined': self.since,
+            }
+
+    def groups(self):
+        for group_id in range(1, self.scale.groups + 1):
+            yield {
+                'id': group_id,
+                'title': self.fake.catch_phrase()[:200],
+                'slug': f'seed-{self.seed}-{group_id}',
+                'description': self.fake.paragraph(),
+            }
+
+    def posts(self):
+        for post_id in range(1, self.scale.posts + 1):
+            in_group = self.scale.groups and self.random.random() < 0.7
+            with_image = self.random.random() < self.scale.image_share
+            yield {
+                'id': post_id,
+                'text': self.fake.paragraph(
+                    nb_sentences=self.random.randint(1, 12)
+                ),
+                'pub_date': self.post_date(post_id),
+                'author_id': self.pick(self.author_weights),
+                'group_id': (
+                    self.pick(self.group_weights) if in_group else None
+                ),
+                'image': self.image() if with_image else '',
+                'image_width': IMAGE_SIZE[0] if with_image else None,
+                'image_height': IMAGE_SIZE[1] if with_image else None,
+            }
+
+    def comments(self):
+        if not self.scale.posts:
+            return
+        for comment_id in range(1, self.scale.comments + 1):
+            # Свежие посты комментируют чаще
+            post_id = self.scale.posts - int(
+                self.scale.posts * self.random.random() ** 3
+            )
+            created = self.post_date(post_id) + timedelta(
+                minutes=self.random.expovariate(1 / 60)
+            )
+            yield {
+                'id': comment_id,
+                'post_id': post_id,
+                'author_id': self.random.randint(1, self.scale.users),
+                'text': self.fake.sentence(),
+                'created': min(created, self.until),
+            }
+
+    def follows(self):
+        """Число подписок - по Парето, авторы - по популярности"""
+        follow_id = 0
+        for user_id in range(1, self.scale.users + 1):
+            wanted = min(
+                int(self.random.paretovariate(FOLLOWS_PARETO_ALPHA)
+                    * self.scale.follows / PARETO_MEAN),
+                self.scale.users - 1,
+            )
+            authors = set()
+            # Популярных авторов выбирают чаще, повторы отбрасываются
+            for _ in range(wanted * 3):
+                if len(authors) == wanted:
+                    break
+                author_id = self.pick(self.author_weights)
+                if author_id != user_id:
+                    authors.add(author_id)
+            for author_id in sorted(authors):
+                follow_id += 1
+                yield {
+                    'id': follow_id,
+                    'user_id': user_id,
+                    'author_id': author_id,
+                }
+
+    def image(self):
+        """Путь к одной из нескольких заранее нарисованных картинок"""
+        if not self.images:
+            self.images = [
+                self.draw_image(number) for number in range(10)
+            ]
+        return self.random.choice(self.images)
+
+    def draw_image(self, number):
+        name = f'{settings.POSTS_MEDIA_ROOT}seed-{self.seed}-{number}.jpg'
+        # Свой генератор: уже нарисованные картинки не сдвигают остальные
+        rng = random.Random(f'{self.seed}-{number}')
+        color = tuple(rng.randrange(256) for _ in range(3))
+        image = Image.new('RGB', IMAGE_SIZE, color)
+        draw = ImageDraw.Draw(image)
+        for _ in range(8):
+            x, y = (rng.randrange(side) for side in IMAGE_SIZE)
+            radius = rng.randrange(40, 200)
+            draw.ellipse(
+                (x - radius, y - radius, x + radius, y + radius),
+                fill=tuple(rng.randrange(256) for _ in range(3)),
+            )
+        content = BytesIO()
+        image.save(content, 'JPEG', quality=85)
+        # Хранилище по хешу не записывает уже сохранённую картинку заново
+        return image_storage().save(name, ContentFile(content.getvalue()))
+
+    def rows(self, table_name):
+        return getattr(self, table_name)()
+
+
+def seed_data(scale=DEFAULT_SCALE, seed=0, batch_size=CHUNK_SIZE,
+              progress=None):
+    """Создаёт данные; возвращает число строк по таблицам"""
+    seeder = Seeder(scale, seed)
+    importer = Importer(batch_size, progress)
+    totals = {
+        table.name: importer.load_table(table, seeder.rows(table.name))
+        for table in TABLES
+    }
+    importer.rebuild_derived()
+    return totals
@@ -0,0 +1,144 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.cache import bump_versions
+
+from jobs.queue import enqueue
+
+from . import counters, media, tasks, thumbnails, timeline
+from .search import get_backend as get_search_backend
+from .cache import (
+    GROUPS_SCOPE,
+    USERS_SCOPE,
+    author_scope,
+    group_scope,
+    invalidate_post_cards,
+    invalidate_post_pages,
+    post_scope,
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+    elif not raw and kwargs.get('update_fields') != {'last_login'}:
+        # Имя автора выводится в карточках постов на всех лентах
+        bump_versions(USERS_SCOPE)
+        invalidate_post_cards(Post.objects.filter(author=instance))
+
+
+@receiver(pre_save, sender=Group)
+def group_pre_save(sender, instance, raw=False, **kwargs):
+    instance._old_slug = None
+    if instance.pk and not raw:
+        instance._old_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    scopes = [GROUPS_SCOPE, group_scope(instance.slug)]
+    if instance._old_slug:
+        scopes.append(group_scope(instance._old_slug))
+    bump_versions(*scopes)
+    if not created:
+        invalidate_post_cards(instance.posts.all())
+
+
+@receiver(pre_delete, sender=Group)
+def group_pre_delete(sender, instance, **kwargs):
+    # Посты останутся без группы, ссылка на неё в карточке устареет
+    invalidate_post_cards(instance.posts.all())
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    bump_versions(GROUPS_SCOPE, group_scope(instance.slug))
+
+
+@receiver(pre_save, sender=Post)
+def post_pre_save(sender, instance, raw=False, **kwargs):
+    instance._old_group_id = instance._old_image = None
+    if instance.pk and not raw:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+        enqueue(tasks.fan_out_post, instance.pk)
+    elif instance._old_group_id != instance.group_id:
+        counters.change_group(instance._old_group_id, -1)
+        counters.change_group(instance.group_id, 1)
+    if instance.image.name != instance._old_image:
+        media.acquire(instance.image.name)
+        media.release(instance._old_image)
+    invalidate_post_pages(instance, instance.group_id, instance._old_group_id)
+    thumbnails.schedule_on_commit(instance, retry=True)
+    enqueue(tasks.index_post, instance.pk, key=f'index:{instance.pk}')
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+    media.release(instance.image.name)
+    invalidate_post_pages(instance, instance.group_id)
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_post(instance.post_id, 1)
+        enqueue(tasks.notify_comment, instance.pk)
+    bump_versions(post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post(instance.post_id, -1)
+    bump_versions(post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user(instance.author_id, 'followers_count', 1)
+        counters.change_user(instance.user_id, 'following_count', 1)
+        enqueue(tasks.add_follow, instance.user_id, instance.author_id)
+        bump_versions(author_scope(instance.author.username))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'followers_count', -1)
+    counters.change_user(instance.user_id, 'following_count', -1)
+    timeline.remove_follow(instance)
+    # Посты бывшего популярного автора больше не подмешиваются при
+    # чтении и должны попасть в ленты подписчиков
+    if timeline.dropped_below_celebrity(instance.author_id):
+        enqueue(
+            tasks.backfill_author,
+            instance.author_id,
+            key=f'backfill:{instance.author_id}',
+        )
+    bump_versions(author_scope(instance.author.username))
@@ -0,0 +1,76 @@
+"""
+Стеммер для русского языка (упрощённый алгоритм Snowball / Портера).
+
+Используется поиском: и текст постов, и запрос приводятся к основам,
+чтобы «посты», «поста» и «постом» находили друг друга.
+Слова без русских гласных возвращаются в нижнем регистре как есть.
+"""
+import re
+
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(с[яь])$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_ENDING = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+I_ENDING = re.compile(r'и$')
+SOFT_SIGN = re.compile(r'ь$')
+DOUBLE_N = re.compile(r'нн$')
+WORD = re.compile(r'\w+')
+
+
+def _cut(pattern, word):
+    return pattern.sub('', word, count=1)
+
+
+def stem(word):
+    """Основа слова"""
+    word = word.lower().replace('ё', 'е')
+    match = RV.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+
+    without_gerund = _cut(PERFECTIVE_GERUND, rv)
+    if without_gerund != rv:
+        rv = without_gerund
+    else:
+        rv = _cut(REFLEXIVE, rv)
+        without_adjective = _cut(ADJECTIVE, rv)
+        if without_adjective != rv:
+            rv = _cut(PARTICIPLE, without_adjective)
+        else:
+            without_verb = _cut(VERB, rv)
+            rv = without_verb if without_verb != rv else _cut(NOUN, rv)
+
+    rv = _cut(I_ENDING, rv)
+    if DERIVATIONAL.match(rv):
+        rv = _cut(DERIVATIONAL_ENDING, rv)
+
+    without_soft_sign = _cut(SOFT_SIGN, rv)
+    if without_soft_sign != rv:
+        rv = without_soft_sign
+    else:
+        rv = DOUBLE_N.sub('н', _cut(SUPERLATIVE, rv), count=1)
+    return start + rv
+
+
+def stems(text):
+    """Основы всех слов текста по порядку"""
+    return [stem(word) for word in WORD.findall(text or '')]
@@ -0,0 +1,58 @@
+"""
+Хранилище картинок постов по хешу содержимого.
+
+Файл сохраняется под именем из SHA-256 своего содержимого и
+раскладывается по подкаталогам из первых символов хеша:
+posts/ab/cd/abcd...ef.jpg. Одинаковая картинка, загруженная разными
+постами, хранится и уменьшается sorl-thumbnail один раз, а в каталоге
+не скапливаются десятки тысяч файлов. Сколько постов ссылается на
+файл, считает posts.media, он же удаляет файлы без ссылок.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# Уровни подкаталогов и длина имени каждого
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы с одинаковым содержимым сохраняются один раз"""
+
+    def hashed_name(self, name, content):
+        directory, filename = posixpath.split(name)
+        digest = content_hash(content)
+        shards = [
+            digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+            for level in range(SHARD_LEVELS)
+        ]
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, *shards, digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Свежая дата изменения не даёт сборщику удалить файл,
+            # пока новая ссылка на него ещё не записана (posts.media)
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,66 @@
+"""
+Фоновые задачи постов (jobs.queue): то, что при записи дорого
+делать внутри запроса.
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+from django.urls import reverse
+
+from jobs.queue import job
+
+from . import timeline
+from .models import Comment, Follow, Post
+from .search import get_backend as get_search_backend
+
+
+@job('posts.fan_out')
+def fan_out_post(post_id):
+    """Раздаёт пост по лентам подписчиков автора"""
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date'
+    ).first()
+    if post is not None:
+        timeline.fan_out_post(post)
+
+
+@job('posts.add_follow')
+def add_follow(user_id, author_id):
+    """Переносит посты автора в ленту нового подписчика"""
+    follow = Follow.objects.filter(user_id=user_id, author_id=author_id)
+    # Пользователь мог отписаться, пока задача ждала
+    if follow.exists():
+        timeline.add_follow(Follow(user_id=user_id, author_id=author_id))
+
+
+@job('posts.backfill_author')
+def backfill_author(author_id):
+    """Раздаёт посты автора, который перестал быть популярным"""
+    timeline.backfill_author(author_id)
+
+
+@job('posts.index')
+def index_post(post_id):
+    """Обновляет пост в поисковом индексе"""
+    post = Post.objects.filter(pk=post_id).only('text').first()
+    if post is not None:
+        get_search_backend().index(post)
+
+
+@job('posts.notify_comment')
+def notify_comment(comment_id):
+    """Письмо автору поста о новом комментарии"""
+    comment = Comment.objects.select_related(
+        'author', 'post__author'
+    ).filter(pk=comment_id).first()
+    if comment is None:
+        return
+    recipient = comment.post.author
+    if not recipient.email or recipient == comment.author:
+        return
+    url = reverse('posts:post_detail', args=(comment.post_id,))
+    send_mail(
+        f'Новый комментарий от {comment.author.username}',
+        f'{comment.text}\n\n{settings.SITE_URL}{url}',
+        None,
+        [recipient.email],
+    )
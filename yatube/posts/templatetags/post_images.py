@@ -0,0 +1,20 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, size='card'):
+    """
+    Готовая миниатюра картинки или None.
+    Если миниатюры ещё нет, она ставится в очередь на создание.
+    """
+    if not image:
+        return None
+    thumbnail = thumbnails.get_ready_thumbnail(image, size)
+    post = getattr(image, 'instance', None)
+    if thumbnail is None and post is not None and post.pk:
+        thumbnails.schedule_on_commit(post)
+    return thumbnail
@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase, TestCase
+
+from ..management.commands.benchmark import Command, compare, dataset_scale
+from ..models import Group, Post, User
+
+BASELINE = {
+    '1000': {
+        'index': {
+            'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30,
+            'queries': 4, 'peak_kb': 300,
+        },
+    },
+}
+
+
+class BenchmarkCompareTest(SimpleTestCase):
+
+    def results(self, **changes):
+        metrics = dict(BASELINE['1000']['index'], **changes)
+        return {'1000': {'index': metrics}}
+
+    def test_within_tolerance(self):
+        """Рост в пределах допуска и новые страницы не регрессии"""
+        results = self.results(p95_ms=23, peak_kb=330)
+        results['1000']['profile'] = results['1000']['index']
+        self.assertEqual(compare(results, BASELINE, 0.2), [])
+
+    def test_regressions(self):
+        """Медленнее допуска или больше запросов - регрессия"""
+        regressions = compare(
+            self.results(p50_ms=13, queries=5), BASELINE, 0.2
+        )
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('1000/index: p50_ms', regressions[0])
+        self.assertIn('queries', regressions[1])
+
+    def test_dataset_scale(self):
+        """Остальные таблицы растут вместе с числом постов"""
+        scale = dataset_scale(10000)
+        self.assertEqual(scale.posts, 10000)
+        self.assertEqual(scale.users, 500)
+        self.assertEqual(scale.comments, 20000)
+
+
+class BenchmarkUrlsTest(TestCase):
+
+    def test_urls_small_dataset(self):
+        """Без второй страницы ленты нет и замера по курсору"""
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='Пост', author=author, group=group)
+        names = [name for name, _ in Command.urls()]
+        self.assertIn('index_last', names)
+        self.assertNotIn('index_cursor', names)
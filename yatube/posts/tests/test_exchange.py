@@ -0,0 +1,93 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, User
+from ..search import search_post_ids
+
+
+class ExchangeTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Кошки, "кавычки"\nи перевод строки',
+            author=cls.author,
+            group=cls.group,
+        )
+        cls.published = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=cls.post.pk).update(pub_date=cls.published)
+        Post.objects.create(text='Без группы', author=cls.reader)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def run_command(self, name, *args):
+        call_command(name, *args, stdout=StringIO())
+
+    def test_round_trip(self):
+        """Выгруженные данные загружаются в пустую базу без потерь"""
+        for data_format in ('jsonl', 'csv'):
+            with self.subTest(format=data_format), \
+                    tempfile.TemporaryDirectory() as directory:
+                self.run_command(
+                    'export_data', directory, '--format', data_format,
+                    '--chunk-size', '1',
+                )
+                User.objects.all().delete()
+                Group.objects.all().delete()
+                self.assertFalse(Post.objects.exists())
+                self.run_command(
+                    'import_data', directory, '--format', data_format,
+                    '--batch-size', '1',
+                )
+
+                post = Post.objects.get(group__slug='group')
+                self.assertEqual(post.text, self.post.text)
+                self.assertEqual(post.author.username, 'author')
+                self.assertEqual(post.pub_date, self.published)
+                self.assertEqual(Post.objects.count(), 2)
+                self.assertIsNone(
+                    Post.objects.get(text='Без группы').group_id
+                )
+                comment = Comment.objects.get()
+                self.assertEqual(comment.post, post)
+                self.assertEqual(comment.author.username, 'reader')
+                reader = User.objects.get(username='reader')
+                self.assertEqual(reader.password, self.reader.password)
+                self.assertTrue(Follow.objects.filter(
+                    user=reader, author=post.author
+                ).exists())
+                # Производные данные пересчитаны после загрузки
+                self.assertTrue(TimelineEntry.objects.filter(
+                    user=reader, post=post
+                ).exists())
+                self.assertEqual(post.author.stats.posts_count, 1)
+                self.assertEqual(post.comments_count, 1)
+                self.assertEqual(search_post_ids('кошка'), [post.id])
+
+    def test_import_merges_existing(self):
+        """Существующие пользователи и группы не дублируются"""
+        with tempfile.TemporaryDirectory() as directory:
+            self.run_command('export_data', directory)
+            self.run_command('import_data', directory)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            self.author.posts.filter(group=self.group).count(), 2
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
@@ -1,12 +1,14 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.test import TestCase, Client, override_settings
+from PIL import Image
 
 from posts.models import Post, Group
 
@@ -86,6 +88,32 @@ class FormsTests(TestCase):
         )
         self.assertNotEqual(posts_count, Post.objects.count())
 
+    @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_IMAGE_MAX_SIZE=100)
+    def test_create_post_image_processed(self):
+        """Картинка уменьшается, поворачивается и теряет EXIF"""
+        exif = Image.Exif()
+        # Снимок повёрнут на 90 градусов
+        exif[0x0112] = 6
+        content = BytesIO()
+        Image.new('RGB', (300, 200), 'red').save(
+            content, 'JPEG', exif=exif.tobytes()
+        )
+        uploaded = SimpleUploadedFile(
+            name='photo.jpeg',
+            content=content.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.authorized_client.post(
+            reverse(POST_CREATE_URL_NAME),
+            data={'text': POST_TEXT, 'image': uploaded},
+        )
+        post = Post.objects.get(image__endswith='.jpg')
+        self.assertEqual((post.image_width, post.image_height), (67, 100))
+        with Image.open(post.image) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (67, 100))
+            self.assertNotIn('exif', image.info)
+
     def test_create_post_invalid_image(self):
         """Проверка с другим файлом вместо картинки"""
         uploaded = SimpleUploadedFile(
@@ -0,0 +1,130 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from jobs.models import Job
+from jobs.queue import execute
+from posts import media
+from posts.models import MediaFile, Post
+
+from ..constants import POST_TEXT, USER_NAME
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(color='red'):
+    content = BytesIO()
+    Image.new('RGB', (40, 30), color).save(content, 'PNG')
+    return SimpleUploadedFile('photo.png', content.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_GC_GRACE=0)
+class MediaStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=USER_NAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, image):
+        return Post.objects.create(
+            text=POST_TEXT, author=self.author, image=image
+        )
+
+    def test_same_content_stored_once(self):
+        """Одинаковые картинки разных постов - один файл в подкаталоге"""
+        first = self.create_post(upload())
+        second = self.create_post(upload())
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$',
+        )
+        self.assertEqual(
+            MediaFile.objects.get(name=first.image.name).references, 2
+        )
+
+    def test_file_collected_without_references(self):
+        """Файл удаляется, когда на него не ссылается ни один пост"""
+        first = self.create_post(upload())
+        second = self.create_post(upload())
+        name = first.image.name
+        storage = media.image_storage()
+        first.delete()
+        self.assertFalse(media.collect(name))
+        self.assertTrue(storage.exists(name))
+        second.delete()
+        self.assertTrue(media.collect(name))
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+
+    def test_replaced_image_released(self):
+        """Замена картинки снимает ссылку со старого файла"""
+        post = self.create_post(upload())
+        old_name = post.image.name
+        post.image = upload('blue')
+        post.save()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertEqual(MediaFile.objects.get(name=old_name).references, 0)
+        self.assertEqual(
+            MediaFile.objects.get(name=post.image.name).references, 1
+        )
+
+    def test_fresh_file_kept(self):
+        """Недавно сохранённый файл не удаляется"""
+        post = self.create_post(upload())
+        name = post.image.name
+        post.delete()
+        with override_settings(MEDIA_GC_GRACE=60):
+            self.assertFalse(media.collect(name))
+        self.assertTrue(media.image_storage().exists(name))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_fresh_file_collected_later(self):
+        """Задача для свежего файла откладывается до конца срока"""
+        post = self.create_post(upload())
+        name = post.image.name
+        post.delete()
+        with override_settings(MEDIA_GC_GRACE=60):
+            self.assertFalse(media.collect(name))
+        retry = Job.objects.get(name='posts.collect_media')
+        self.assertEqual(json.loads(retry.args), [name])
+        self.assertGreater(retry.run_at, timezone.now())
+        execute(retry)
+        self.assertFalse(media.image_storage().exists(name))
+
+    def test_file_reused_during_collect_kept(self):
+        """Файл, использованный заново во время удаления, остаётся"""
+        post = self.create_post(upload())
+        name = post.image.name
+        post.delete()
+        with mock.patch.object(media, 'grace_left', side_effect=[0, 60]):
+            self.assertFalse(media.collect(name))
+        self.assertTrue(media.image_storage().exists(name))
+        self.assertEqual(MediaFile.objects.get(name=name).references, 0)
+
+    def test_collect_orphans(self):
+        """Сборщик пересчитывает ссылки и удаляет потерянные файлы"""
+        post = self.create_post(upload())
+        storage = media.image_storage()
+        orphan = storage.save('posts/lost.jpg', ContentFile(b'lost'))
+        MediaFile.objects.all().delete()
+        self.assertEqual(media.recount_references(), 1)
+        self.assertEqual(media.collect_orphans(), 1)
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(post.image.name))
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post, UserStats
 from ..constants import (
     USER_NAME,
     GROUP_TITLE,
@@ -38,3 +41,70 @@ class PostModelTest(TestCase):
 
         test_group = PostModelTest.group
         self.assertEqual(str(test_group), test_group.title)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=USER_NAME)
+        cls.reader = User.objects.create_user(username=f'{USER_NAME}2')
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+
+    def assertCounters(self, posts, comments, followers, group_posts):
+        self.author.stats.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, posts)
+        self.assertEqual(self.author.stats.followers_count, followers)
+        self.assertEqual(self.group.posts_count, group_posts)
+        if comments is not None:
+            self.post.refresh_from_db()
+            self.assertEqual(self.post.comments_count, comments)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании и удалении записей"""
+        self.post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.author,
+            group=self.group,
+        )
+        comment = Comment.objects.create(
+            post=self.post,
+            author=self.reader,
+            text=POST_TEXT,
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(posts=1, comments=1, followers=1, group_posts=1)
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.following_count, 1)
+
+        comment.delete()
+        follow.delete()
+        self.assertCounters(posts=1, comments=0, followers=0, group_posts=1)
+
+        self.post.group = None
+        self.post.save()
+        self.assertCounters(posts=1, comments=0, followers=0, group_posts=0)
+
+        self.post.delete()
+        self.assertCounters(posts=0, comments=None, followers=0,
+                            group_posts=0)
+
+    def test_recount_counters_command(self):
+        """Команда recount_counters чинит разошедшиеся счётчики"""
+        self.post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.author,
+            group=self.group,
+        )
+        UserStats.objects.update(posts_count=10)
+        Group.objects.update(posts_count=0)
+        UserStats.objects.filter(user=self.reader).delete()
+
+        call_command('recount_counters', stdout=StringIO())
+
+        self.assertCounters(posts=1, comments=0, followers=0, group_posts=1)
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
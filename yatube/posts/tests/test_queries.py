@@ -0,0 +1,182 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..management.commands.check_query_plans import plan_problems
+from ..models import Comment, Follow, Group, Post, User
+from ..paginators import NEXT, PREVIOUS, CursorPaginator, encode_cursor
+from ..constants import (
+    USER_NAME,
+    GROUP_TITLE,
+    GROUP_SLUG,
+    GROUP_DESCRIPTION,
+    POST_TEXT,
+    INDEX_URL_NAME,
+    GROUP_LIST_URL_NAME,
+    PROFILE_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    FOLLOW_INDEX_URL_NAME,
+)
+
+POSTS_COUNT = 15
+PAGE_SIZES = (2, 10)
+COMMENT_COUNTS = (1, 10)
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Число запросов к БД на страницу не зависит от размера страницы.
+    Бюджет считается для авторизованного пользователя:
+    сессия и пользователь - два запроса из бюджета.
+    """
+    budgets = {
+        INDEX_URL_NAME: 4,
+        GROUP_LIST_URL_NAME: 5,
+        PROFILE_URL_NAME: 6,
+        FOLLOW_INDEX_URL_NAME: 5,
+    }
+    # Ещё один запрос - ETag страницы (posts.cache.post_detail_state)
+    post_detail_budget = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=USER_NAME)
+        cls.reader = User.objects.create_user(username=f'{USER_NAME}2')
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                text=f'{POST_TEXT}{i}',
+                author=cls.author,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def tearDown(self):
+        cache.clear()
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_post_lists_query_budget(self):
+        """Ленты постов укладываются в бюджет запросов"""
+        urls = {
+            INDEX_URL_NAME: reverse(INDEX_URL_NAME),
+            GROUP_LIST_URL_NAME: reverse(
+                GROUP_LIST_URL_NAME,
+                kwargs={'slug': self.group.slug},
+            ),
+            PROFILE_URL_NAME: reverse(
+                PROFILE_URL_NAME,
+                kwargs={'username': self.author.username},
+            ),
+            FOLLOW_INDEX_URL_NAME: reverse(FOLLOW_INDEX_URL_NAME),
+        }
+        for url_name, url in urls.items():
+            for page_size in PAGE_SIZES:
+                for cursor_mode in (False, True):
+                    with self.subTest(url_name=url_name,
+                                      page_size=page_size,
+                                      cursor_mode=cursor_mode):
+                        with override_settings(
+                            POSTS_PER_PAGE=page_size,
+                            POSTS_CURSOR_PAGINATION=cursor_mode,
+                        ):
+                            self.assertLessEqual(
+                                self.count_queries(url),
+                                self.budgets[url_name],
+                            )
+
+    def test_post_detail_query_budget(self):
+        """Страница поста не делает запросов на каждый комментарий"""
+        post = Post.objects.first()
+        url = reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': post.id})
+        created = 0
+        for comments in COMMENT_COUNTS:
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.reader, text=POST_TEXT)
+                for _ in range(comments - created)
+            )
+            created = comments
+            with self.subTest(comments=comments):
+                self.assertLessEqual(
+                    self.count_queries(url),
+                    self.post_detail_budget,
+                )
+
+
+class QueryPlanTest(TestCase):
+    def test_post_lists_use_indexes(self):
+        """Запросы страниц со списками не сканируют и не сортируют таблицы"""
+        output = StringIO()
+        call_command('check_query_plans', stdout=output, stderr=output)
+        self.assertFalse(
+            Post.objects.filter(text='Пост').exists(),
+            'Пример данных должен откатываться',
+        )
+
+
+class PlanProblemsTest(SimpleTestCase):
+    def test_index_scan_is_full_scan(self):
+        """Обход по индексу - полное сканирование, кроме разрешённых"""
+        self.assertIsNotNone(plan_problems(
+            'SCAN posts_post USING COVERING INDEX posts_post_pub_date_1',
+            'SELECT (1) AS "a" FROM "posts_post" WHERE NOT (...) LIMIT 1',
+        ))
+        self.assertIsNone(plan_problems(
+            'SCAN posts_post USING INDEX posts_post_pub_date_1',
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            'ORDER BY "posts_post"."pub_date" DESC LIMIT 11',
+        ))
+        self.assertIsNotNone(plan_problems(
+            'SCAN posts_post USING INDEX posts_post_pub_date_1',
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            'ORDER BY "posts_post"."pub_date" DESC LIMIT 11 OFFSET 990',
+        ))
+        self.assertIsNone(plan_problems('SCAN posts_post_fts VIRTUAL TABLE'))
+
+
+class CursorPlanTest(TestCase):
+    """Страница по курсору и проверки соседних страниц идут по индексу"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username=USER_NAME)
+        for i in range(POSTS_COUNT):
+            Post.objects.create(text=f'{POST_TEXT}{i}', author=author)
+        cls.post = Post.objects.order_by('-pub_date', '-id')[5]
+
+    def plans(self, cursor):
+        paginator = CursorPaginator(Post.objects.all(), 5)
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(cursor)
+        plans = []
+        with connection.cursor() as db_cursor:
+            for query in queries.captured_queries:
+                db_cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                plans += [row[-1] for row in db_cursor.fetchall()]
+        return plans
+
+    def test_no_full_scans(self):
+        position = (self.post.pub_date, self.post.pk)
+        for direction in (NEXT, PREVIOUS):
+            with self.subTest(direction=direction):
+                plans = self.plans(encode_cursor(position, direction))
+                self.assertTrue(plans)
+                for detail in plans:
+                    self.assertFalse(detail.startswith('SCAN'), detail)
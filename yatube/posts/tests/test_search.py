@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+from ..search import search_post_ids
+from ..stemmer import stems
+from ..constants import USER_NAME, SEARCH_URL_NAME, SEARCH_TEMPLATE
+
+
+class SearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=USER_NAME)
+        cls.cats = Post.objects.create(
+            text='Кошки любят спать на тёплых подоконниках',
+            author=cls.author,
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки и кошки: кошка дружит с собакой',
+            author=cls.author,
+        )
+        cls.other = Post.objects.create(
+            text='Про программирование на Python',
+            author=cls.author,
+        )
+
+    def test_stemmer(self):
+        """Разные формы слова приводятся к одной основе"""
+        self.assertEqual(len(set(stems('кошка кошки кошками'))), 1)
+        self.assertEqual(stems('Python'), ['python'])
+
+    def test_search_uses_word_forms_and_rank(self):
+        """Поиск находит словоформы и ставит выше более полные совпадения"""
+        self.assertEqual(search_post_ids('кошками'), [self.dogs.id,
+                                                      self.cats.id])
+        self.assertEqual(search_post_ids('собака'), [self.dogs.id])
+        self.assertEqual(search_post_ids('питон'), [])
+        self.assertEqual(search_post_ids('python'), [self.other.id])
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        post = Post.objects.get(pk=self.other.pk)
+        post.text = 'Про кошку'
+        post.save()
+        self.assertIn(self.other.id, search_post_ids('кошка'))
+        self.assertEqual(search_post_ids('python'), [])
+
+        post.delete()
+        self.assertNotIn(self.other.id, search_post_ids('кошка'))
+
+    def test_search_view(self):
+        """Страница поиска выводит найденные посты"""
+        response = self.client.get(reverse(SEARCH_URL_NAME), {'q': 'собак'})
+        self.assertTemplateUsed(response, SEARCH_TEMPLATE)
+        self.assertEqual(list(response.context['page_obj']), [self.dogs])
+
+        response = self.client.get(reverse(SEARCH_URL_NAME))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_rebuild_search_index(self):
+        """Команда rebuild_search_index находит посты, созданные в обход"""
+        Post.objects.bulk_create(
+            [Post(text='Попугаи умеют говорить', author=self.author)]
+        )
+        self.assertEqual(search_post_ids('попугай'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(search_post_ids('попугай')), 1)
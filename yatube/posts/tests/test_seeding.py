@@ -0,0 +1,52 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, User
+from ..seeding import DEFAULT_SCALE, Seeder
+
+SCALE = DEFAULT_SCALE._replace(
+    users=30, groups=3, posts=100, comments=50, follows=5, image_share=0,
+)
+
+
+class SeedTest(TestCase):
+
+    def rows(self, seed):
+        seeder = Seeder(SCALE, seed)
+        return {
+            table: list(seeder.rows(table))
+            for table in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+
+    def test_same_seed_same_data(self):
+        """Одинаковый seed даёт одинаковые строки, другой - другие"""
+        self.assertEqual(self.rows(1), self.rows(1))
+        self.assertNotEqual(self.rows(1)['posts'], self.rows(2)['posts'])
+
+    def test_popular_authors(self):
+        """Подписчики и посты сосредоточены у немногих авторов"""
+        rows = self.rows(0)
+        first = sum(post['author_id'] == 1 for post in rows['posts'])
+        last = sum(post['author_id'] == SCALE.users for post in rows['posts'])
+        self.assertGreater(first, last)
+        self.assertTrue(all(
+            follow['user_id'] != follow['author_id']
+            for follow in rows['follows']
+        ))
+
+    def test_command(self):
+        """Команда создаёт заданное число строк"""
+        call_command(
+            'seed', '--users', '30', '--groups', '3', '--posts', '100',
+            '--comments', '50', '--follows', '5', '--image-share', '0',
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertTrue(Follow.objects.exists())
+        author = Post.objects.first().author
+        self.assertEqual(author.stats.posts_count, author.posts.count())
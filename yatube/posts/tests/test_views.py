@@ -9,16 +9,21 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import (
     Client,
     TestCase,
+    override_settings,
 )
 from django.urls import reverse
 
 from ..models import (
+    Comment,
     Group,
     Post,
     User,
     Follow,
+    TimelineEntry,
 )
 from posts.forms import PostForm
+from posts.paginators import CursorPage
+from posts import thumbnails
 
 from ..constants import (
     USER_NAME,
@@ -32,8 +37,11 @@ from ..constants import (
     POST_CREATE_URL_NAME,
     POST_EDIT_URL_NAME,
     POST_DETAIL_URL_NAME,
+    POST_COMMENTS_URL_NAME,
+    COMMENTS_TEMPLATE,
     FOLLOW_URL_NAME,
     UNFOLLOW_URL_NAME,
+    FOLLOW_INDEX_URL_NAME,
 )
 from yatube.settings import POSTS_PER_PAGE
 
@@ -107,6 +115,43 @@ class ViewsTest(TestCase):
                     transform=lambda x: x
                 )
 
+    @override_settings(POSTS_CURSOR_PAGINATION=True)
+    def test_cursor_paginator(self):
+        """Курсорный паджинатор обходит ленту без пропусков и повторов"""
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        url = reverse(INDEX_URL_NAME)
+
+        response = self.client.get(url)
+        page_obj = response.context.get('page_obj')
+        self.assertIsInstance(page_obj, CursorPage)
+        self.assertFalse(page_obj.has_previous())
+        self.assertTrue(page_obj.has_next())
+        self.assertEqual(list(page_obj), expected[:POSTS_PER_PAGE])
+
+        cache.clear()
+        response = self.client.get(url, {'cursor': page_obj.next_cursor})
+        second_page = response.context.get('page_obj')
+        self.assertEqual(list(second_page), expected[POSTS_PER_PAGE:])
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+
+        cache.clear()
+        response = self.client.get(
+            url, {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context.get('page_obj')),
+            expected[:POSTS_PER_PAGE],
+        )
+
+        cache.clear()
+        response = self.client.get(url, {'cursor': 'broken'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            list(response.context.get('page_obj')),
+            expected[:POSTS_PER_PAGE],
+        )
+
     def test_context_posts_pages(self):
         """Проверка контекста"""
         post = Post.objects.last()
@@ -248,17 +293,130 @@ class ViewsTest(TestCase):
         response = self.client.get(reverse(INDEX_URL_NAME))
         content = response.content
 
-        Post.objects.all().delete()
-
-        # Получаем кешированный контент
+        # Изменение в обход сигналов не сбрасывает кеш
+        Post.objects.update(text='Изменённый текст')
         response = self.client.get(reverse(INDEX_URL_NAME))
         self.assertEqual(content, response.content)
 
-        cache.clear()
-
-        # Получаем новый контент
+        # Новый пост сразу сбрасывает кеш главной страницы
+        Post.objects.create(text='Новый пост', author=self.author)
         response = self.client.get(reverse(INDEX_URL_NAME))
         self.assertNotEqual(content, response.content)
+        self.assertContains(response, 'Новый пост')
+
+    def test_cache_invalidation_by_scope(self):
+        """Кеш группы и профиля сбрасывается только их изменениями"""
+        other_author = User.objects.create_user(username='other')
+        urls = {
+            'group': reverse(GROUP_LIST_URL_NAME,
+                             kwargs={'slug': self.group.slug}),
+            'profile': reverse(PROFILE_URL_NAME,
+                               kwargs={'username': self.author.username}),
+        }
+        cached = {
+            name: self.client.get(url).content for name, url in urls.items()
+        }
+
+        Post.objects.create(text='Чужой пост', author=other_author)
+        for name, url in urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(self.client.get(url).content, cached[name])
+
+        Post.objects.create(
+            text='Пост в группе',
+            author=self.author,
+            group=self.group,
+        )
+        for name, url in urls.items():
+            with self.subTest(page=name):
+                self.assertContains(self.client.get(url), 'Пост в группе')
+
+    def test_conditional_get(self):
+        """Неизменённая страница отдаётся ответом 304 по ETag"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        urls = (
+            reverse(GROUP_LIST_URL_NAME, kwargs={'slug': self.group.slug}),
+            reverse(PROFILE_URL_NAME,
+                    kwargs={'username': self.author.username}),
+            reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': post.id}),
+        )
+        etags = {}
+        for url in urls:
+            with self.subTest(url=url):
+                etags[url] = self.client.get(url)['ETag']
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+        Comment.objects.create(post=post, author=self.author, text='Новый')
+        Post.objects.create(
+            text='Пост в группе', author=self.author, group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_post_detail_last_modified(self):
+        url = reverse(
+            POST_DETAIL_URL_NAME, kwargs={'post_id': Post.objects.first().id}
+        )
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    @override_settings(COMMENTS_PER_PAGE=3)
+    def test_post_detail_comments_paginated(self):
+        """Комментарии выводятся порциями, следующая - фрагментом"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        comments = [
+            Comment.objects.create(
+                post=post, author=self.author, text=f'Комментарий {number}'
+            )
+            for number in range(5)
+        ]
+        response = self.client.get(
+            reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': post.id})
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), comments[:3])
+        self.assertTrue(page.has_next())
+        fragment_url = reverse(
+            POST_COMMENTS_URL_NAME, kwargs={'post_id': post.id}
+        )
+        self.assertContains(response, f'{fragment_url}?order=old&amp;cursor=')
+
+        response = self.client.get(
+            fragment_url, {'cursor': page.next_cursor}
+        )
+        self.assertTemplateUsed(response, COMMENTS_TEMPLATE)
+        self.assertEqual(list(response.context['comments']), comments[3:])
+        self.assertNotContains(response, 'js-more-comments')
+
+        response = self.client.get(
+            fragment_url, {'order': 'new', 'format': 'json'}
+        )
+        data = response.json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            [comment.text for comment in comments[:1:-1]],
+        )
+        self.assertEqual(
+            self.client.get(data['next']).json()['results'][0]['id'],
+            comments[1].id,
+        )
+        response = self.client.get(
+            reverse(POST_COMMENTS_URL_NAME, kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
     def test_follow(self):
         """Тест подписок"""
@@ -298,3 +456,122 @@ class ViewsTest(TestCase):
             Follow.objects.filter(user=self.author,
                                   author=self.follow_author,).exists()
         )
+
+    def test_follow_timeline(self):
+        """Посты автора попадают в ленту подписчика и уходят после отписки"""
+        old_post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.follow_author,
+        )
+        Follow.objects.create(user=self.author, author=self.follow_author)
+        new_post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.follow_author,
+        )
+
+        response = self.auth_client.get(reverse(FOLLOW_INDEX_URL_NAME))
+        self.assertEqual(
+            list(response.context.get('page_obj')),
+            [new_post, old_post],
+        )
+
+        self.auth_client.get(
+            reverse(
+                UNFOLLOW_URL_NAME,
+                kwargs={'username': self.follow_author.username},
+            )
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.author).exists()
+        )
+        response = self.auth_client.get(reverse(FOLLOW_INDEX_URL_NAME))
+        self.assertEqual(len(response.context.get('page_obj')), 0)
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_follow_timeline_celebrity(self):
+        """Посты популярных авторов подмешиваются в ленту при чтении"""
+        Follow.objects.create(user=self.author, author=self.follow_author)
+        post = Post.objects.create(text=POST_TEXT, author=self.follow_author)
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.auth_client.get(reverse(FOLLOW_INDEX_URL_NAME))
+        self.assertEqual(list(response.context.get('page_obj')), [post])
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_follow_timeline_after_celebrity(self):
+        """Посты автора остаются в ленте, когда подписчиков стало меньше"""
+        Follow.objects.create(user=self.author, author=self.follow_author)
+        other = User.objects.create_user(username='other_follower')
+        follow = Follow.objects.create(user=other, author=self.follow_author)
+        post = Post.objects.create(text=POST_TEXT, author=self.follow_author)
+        url = reverse(FOLLOW_INDEX_URL_NAME)
+        response = self.auth_client.get(url)
+        self.assertEqual(list(response.context.get('page_obj')), [post])
+
+        follow.delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.author, post=post).exists()
+        )
+        response = self.auth_client.get(url)
+        self.assertEqual(list(response.context.get('page_obj')), [post])
+
+    @override_settings(
+        MEDIA_ROOT=TEMP_MEDIA_ROOT,
+        POSTS_THUMBNAILS_ASYNC=False,
+    )
+    def test_thumbnail_placeholder(self):
+        """Пока миниатюра не готова, вместо неё выводится заглушка"""
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.author,
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=small_gif,
+                content_type='image/gif',
+            ),
+        )
+        url = reverse(POST_DETAIL_URL_NAME, kwargs={'post_id': post.id})
+
+        response = self.client.get(url)
+        self.assertIsNone(thumbnails.get_ready_thumbnail(post.image, 'card'))
+        self.assertContains(response, 'aspect-ratio')
+
+        thumbnails.schedule(post.id)
+        thumbnail = thumbnails.get_ready_thumbnail(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(url)
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, 'aspect-ratio')
+
+    def test_post_card_fragment_cache(self):
+        """Карточка поста берётся из кеша, пока пост и автор не менялись"""
+        post = Post.objects.create(text='Исходный текст', author=self.author)
+        url = reverse(INDEX_URL_NAME)
+        self.assertContains(self.client.get(url), 'Исходный текст')
+
+        # Правка в обход модели не меняет post.updated
+        Post.objects.filter(pk=post.pk).update(text='Тихая правка')
+        Post.objects.create(text='Другой пост', author=self.follow_author)
+        response = self.client.get(url)
+        self.assertContains(response, 'Другой пост')
+        self.assertContains(response, 'Исходный текст')
+
+        self.author.first_name = 'Новое'
+        self.author.last_name = 'Имя'
+        self.author.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Новое Имя')
+        self.assertContains(response, 'Тихая правка')
+
+        post.refresh_from_db()
+        post.text = 'Отредактированный текст'
+        post.save()
+        self.assertContains(self.client.get(url), 'Отредактированный текст')
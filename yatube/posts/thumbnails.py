@@ -0,0 +1,130 @@
+"""
+Подготовка миниатюр изображений постов вне обработки запроса.
+
+Миниатюры всех размеров из POSTS_THUMBNAILS создаёт фоновая задача
+(jobs), поставленная после коммита поста с картинкой. Шаблоны берут
+только уже готовые миниатюры (тег post_thumbnail) и показывают
+заглушку, пока миниатюры нет, поэтому запрос не ждёт PIL и записи
+на диск.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import enqueue, job
+
+from .cache import invalidate_post_cards, invalidate_post_pages
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# После неудачи миниатюры поста не пересоздаются при каждом показе
+FAILED_RETRY_TIMEOUT = 60 * 60
+# Пока задача ждёт воркера, показы поста не ставят её заново
+QUEUED_TIMEOUT = 10 * 60
+
+
+class ThumbnailError(Exception):
+    pass
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который умеет только искать готовое"""
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None, без обращения к исходнику"""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+ready_backend = ReadyThumbnailBackend()
+
+
+def get_ready_thumbnail(image, size):
+    """Готовая миниатюра размера size из POSTS_THUMBNAILS или None"""
+    geometry, options = settings.POSTS_THUMBNAILS[size]
+    return ready_backend.get_ready_thumbnail(image, geometry, **options)
+
+
+def generate_thumbnails(post):
+    """Создаёт все миниатюры поста; возвращает число созданных"""
+    created = 0
+    for geometry, options in settings.POSTS_THUMBNAILS.values():
+        if ready_backend.get_ready_thumbnail(post.image, geometry, **options):
+            continue
+        default.backend.get_thumbnail(post.image, geometry, **options)
+        # sorl не бросает исключение, если исходник не читается
+        if not ready_backend.get_ready_thumbnail(
+            post.image, geometry, **options
+        ):
+            raise ThumbnailError(f'{post.image} {geometry}')
+        created += 1
+    return created
+
+
+def _failed_key(post_id):
+    return f'thumbnails-failed:{post_id}'
+
+
+def _queued_key(post_id):
+    return f'thumbnails-queued:{post_id}'
+
+
+@job('posts.thumbnails', max_attempts=1)
+def generate_for_post(post_id):
+    """Задача: миниатюры поста и сброс кеша страниц с ним"""
+    try:
+        post = Post.objects.select_related('author').filter(
+            pk=post_id
+        ).first()
+        if post is not None and post.image:
+            if generate_thumbnails(post):
+                invalidate_post_cards(Post.objects.filter(pk=post_id))
+                invalidate_post_pages(post, post.group_id)
+    except Exception:
+        # Неудача запоминается, повторять задачу сразу незачем
+        logger.exception('Не удалось создать миниатюры поста %s', post_id)
+        cache.set(_failed_key(post_id), True, FAILED_RETRY_TIMEOUT)
+    finally:
+        cache.delete(_queued_key(post_id))
+
+
+def schedule(post_id):
+    """Ставит создание миниатюр поста в очередь фоновых задач"""
+    if cache.get(_failed_key(post_id)):
+        return
+    if not cache.add(_queued_key(post_id), True, QUEUED_TIMEOUT):
+        return
+    if settings.POSTS_THUMBNAILS_ASYNC:
+        enqueue(generate_for_post, post_id, key=f'thumbnails:{post_id}')
+    else:
+        generate_for_post(post_id)
+
+
+def schedule_on_commit(post, retry=False):
+    """
+    Создание миниатюр начнётся, когда пост будет сохранён в БД.
+    retry=True сбрасывает отметку о прошлой неудаче (новая картинка).
+    """
+    if not post.image:
+        return
+    post_id = post.pk
+    if retry:
+        cache.delete(_failed_key(post_id))
+    transaction.on_commit(lambda: schedule(post_id))
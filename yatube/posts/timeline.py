@@ -0,0 +1,140 @@
+"""
+Лента подписок с раздачей записей при публикации (fan-out-on-write).
+
+Каждому подписчику автора при создании поста добавляется строка в
+TimelineEntry, и лента читается одним диапазоном по индексу
+(user, -pub_date). Посты авторов, у которых подписчиков не меньше
+TIMELINE_CELEBRITY_FOLLOWERS, не раздаются, а подмешиваются в ленту
+при чтении (fan-out-on-read). Когда подписчиков становится меньше
+порога, все посты автора раздаются заново (backfill_author).
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE = 500
+# Ключ курсора для строк ленты, совпадает с индексом (user, -pub_date, -post)
+CURSOR_FIELDS = ('pub_date', 'post_id')
+
+
+def is_celebrity(author_id):
+    """Слишком много подписчиков, чтобы раздавать посты автора"""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+    ).exists()
+
+
+def dropped_below_celebrity(author_id):
+    """Автор только что перестал быть популярным после отписки"""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_CELEBRITY_FOLLOWERS - 1,
+    ).exists()
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты подписчиков автора"""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            ) for user_id in followers.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def add_follow(follow):
+    """Переносит в ленту подписчика уже опубликованные посты автора"""
+    if is_celebrity(follow.author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=follow.user_id,
+                post_id=post_id,
+                author_id=follow.author_id,
+                pub_date=pub_date,
+            ) for post_id, pub_date in posts.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_author(author_id):
+    """Раздаёт все посты автора подписчикам, которым они не достались"""
+    if is_celebrity(author_id):
+        return
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list('id', 'pub_date')
+    )
+    if not posts:
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for user_id in followers.iterator()
+            for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_follow(follow):
+    """Убирает посты автора из ленты отписавшегося пользователя"""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id,
+        author_id=follow.author_id,
+    ).delete()
+
+
+def celebrities_followed_by(user):
+    """id авторов из подписок, чьи посты читаются без раздачи"""
+    return list(
+        UserStats.objects.filter(
+            user__in=user.follower.values('author_id'),
+            followers_count__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def timeline_entries(user):
+    """Строки ленты вместе с постами, от новых к старым"""
+    return user.timeline.select_related('post__author', 'post__group')
+
+
+def timeline_posts(user, celebrities=None):
+    """Посты ленты подписок пользователя"""
+    posts = Post.objects.filter(timeline_entries__user=user)
+    if celebrities is None:
+        celebrities = celebrities_followed_by(user)
+    if celebrities:
+        posts = Post.objects.filter(
+            Q(pk__in=user.timeline.values('post_id'))
+            | Q(author__in=celebrities)
+        )
+    return posts
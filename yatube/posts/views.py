@@ -1,14 +1,28 @@
+from urllib.parse import quote
+
 from django.shortcuts import (render,
                               get_object_or_404,
                               redirect,
                               )
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
+from django.http import Http404, JsonResponse
 
-from yatube.settings import POSTS_PER_PAGE
+from core.cache import cache_page_versioned, conditional_page
+from core.replicas import read_from_replica
 
-from .models import Post, Group, User, Follow
+from . import cache as page_cache
+from .models import Comment, Post, Group, User, Follow
+from .counters import user_stats
+from .paginators import CursorPaginator
+from .search import search_post_ids
+from .timeline import (
+    CURSOR_FIELDS as TIMELINE_CURSOR_FIELDS,
+    celebrities_followed_by,
+    timeline_entries,
+    timeline_posts,
+)
 from .forms import PostForm, CommentForm
 from .constants import (
     INDEX_TEMPLATE,
@@ -16,24 +30,38 @@ from .constants import (
     PROFILE_TEMPLATE,
     POST_CREATE_TEMPLATE,
     POST_DETAIL_TEMPLATE,
+    SEARCH_TEMPLATE,
+    COMMENTS_TEMPLATE,
     PROFILE_URL_NAME,
     POST_DETAIL_URL_NAME,
 )
 
 
-def paginate(request, posts):
-    paginator = Paginator(posts, POSTS_PER_PAGE)
+def paginate(request, posts, cursor_fields=('pub_date', 'id')):
+    """
+    Постраничный вывод записей.
+    Курсорный режим включается настройкой POSTS_CURSOR_PAGINATION
+    или параметром ?cursor= и не считает записи в таблице.
+    """
+    cursor = request.GET.get('cursor')
+    if settings.POSTS_CURSOR_PAGINATION or cursor is not None:
+        paginator = CursorPaginator(
+            posts, settings.POSTS_PER_PAGE, cursor_fields
+        )
+        return paginator.get_page(cursor)
+    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+@read_from_replica
+@cache_page_versioned('index_page', page_cache.index_scopes)
 def index(request):
     """Главная страница"""
     title = 'Это главная страница проекта Yatube'
     text = 'Последние обновления на сайте'
-    posts = Post.objects.all()
+    posts = Post.objects.select_related('author', 'group')
     page_obj = paginate(request, posts)
     context = {
         'title': title,
@@ -43,11 +71,13 @@ def index(request):
     return render(request, INDEX_TEMPLATE, context)
 
 
+@read_from_replica
+@cache_page_versioned('group_page', page_cache.group_posts_scopes)
 def group_posts(request, slug):
     """Страница группы"""
     group = get_object_or_404(Group, slug=slug)
     description = group.description
-    posts = group.posts.all()
+    posts = group.posts.select_related('author', 'group')
     page_obj = paginate(request, posts)
     context = {
         'group': group,
@@ -58,11 +88,16 @@ def group_posts(request, slug):
     return render(request, GROUP_LIST_TEMPLATE, context)
 
 
+@read_from_replica
+@cache_page_versioned('profile_page', page_cache.profile_scopes)
 def profile(request, username):
     """Профиль пользователя"""
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    posts_count = posts.count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
+    posts = author.posts.select_related('group')
+    posts_count = user_stats(author).posts_count
     page_obj = paginate(request, posts)
     following = False
     if request.user.is_authenticated:
@@ -81,20 +116,73 @@ def profile(request, username):
     return render(request, PROFILE_TEMPLATE, context)
 
 
+@read_from_replica
+@conditional_page(page_cache.post_detail_state)
 def post_detail(request, post_id):
     """Подробности записи"""
-    post = get_object_or_404(Post, id=post_id)
-    posts_count = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id,
+    )
+    posts_count = user_stats(post.author).posts_count
     form = CommentForm()
     context = {
         'post': post,
         'posts_count': posts_count,
         'form': form,
-        'comments': post.comments.all(),
+        **comments_context(request, post.id),
     }
     return render(request, POST_DETAIL_TEMPLATE, context)
 
 
+def comments_context(request, post_id):
+    """
+    Порция комментариев поста по курсору ?cursor=.
+    ?order=new - сначала новые, по умолчанию сначала старые.
+    """
+    order = 'new' if request.GET.get('order') == 'new' else 'old'
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_PER_PAGE,
+        ('created', 'id'),
+        descending=order == 'new',
+    )
+    return {
+        'comments': paginator.get_page(request.GET.get('cursor')),
+        'comments_order': order,
+        'post_id': post_id,
+    }
+
+
+@read_from_replica
+@conditional_page(page_cache.post_detail_state)
+def post_comments(request, post_id):
+    """Следующая порция комментариев: HTML или JSON (?format=json)"""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = comments_context(request, post_id)
+    if request.GET.get('format') != 'json':
+        return render(request, COMMENTS_TEMPLATE, context)
+    page = context['comments']
+    next_url = None
+    if page.has_next():
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_url = f'{request.path}?{query.urlencode()}'
+    return JsonResponse({
+        'results': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created,
+            }
+            for comment in page
+        ],
+        'next': next_url,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
 @login_required
 def post_create(request):
     """Страница создания записи"""
@@ -159,20 +247,48 @@ def add_comment(request, post_id):
     return redirect(POST_DETAIL_URL_NAME, post_id=post_id)
 
 
+def search(request):
+    """Поиск по постам"""
+    query = request.GET.get('q', '').strip()
+    post_ids = search_post_ids(query) if query else []
+    page_obj = Paginator(post_ids, settings.POSTS_PER_PAGE).get_page(
+        request.GET.get('page')
+    )
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        page_obj.object_list
+    )
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+    context = {
+        'title': 'Поиск',
+        'query': query,
+        'page_obj': page_obj,
+        'paginator_query': f'q={quote(query)}&',
+    }
+    return render(request, SEARCH_TEMPLATE, context)
+
+
 @login_required
+@read_from_replica
 def follow_index(request):
-    # не работает с шаблоном posts/post_list.html
-    '''posts = request.user.follower.values_list(
-        'author__posts'
-    ).order_by('author__posts__pub_date')'''
-
-    author_list = request.user.follower.values('author')
-    posts = Post.objects.filter(
-        author__in=author_list
-    )
+    celebrities = celebrities_followed_by(request.user)
+    if celebrities:
+        posts = timeline_posts(request.user, celebrities).select_related(
+            'author', 'group'
+        )
+        page_obj = paginate(request, posts)
+    else:
+        # Страница строится по индексу ленты, без сортировки постов
+        page_obj = paginate(
+            request,
+            timeline_entries(request.user),
+            TIMELINE_CURSOR_FIELDS,
+        )
+        page_obj.object_list = [entry.post for entry in page_obj]
     title = 'Подписки'
     text = 'Обновления'
-    page_obj = paginate(request, posts)
     context = {
         'title': title,
         'text': text,
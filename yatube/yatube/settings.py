@@ -46,10 +46,14 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'jobs.apps.JobsConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.middleware.ThresholdGZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,14 +61,24 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.PrimaryStickinessMiddleware',
 ]
 
+# Метрики представлений (core.metrics). /metrics/ видят сотрудники и
+# запросы с заголовком Authorization: Bearer <METRICS_TOKEN>. Адрес
+# клиента не проверяется: за прокси все запросы приходят с 127.0.0.1
+METRICS_ENABLED = False
+METRICS_SERVER_TIMING = False
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+INTERNAL_IPS = ['127.0.0.1', '::1']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.InstrumentedTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,6 +93,10 @@ TEMPLATES = [
     },
 ]
 
+# Компилировать все шаблоны при старте WSGI-приложения
+# (см. settings_production, где включён кеширующий загрузчик)
+TEMPLATE_WARMUP = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
@@ -89,7 +107,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, PRAGMA не повторяются
+        'CONN_MAX_AGE': 60,
+    }
+}
+
+# Реплики только для чтения: пути к копиям основной базы через запятую.
+# Списки постов читают из реплик (core.replicas), запись - в default.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Сколько секунд писавшая сессия читает из default (отставание реплик)
+REPLICA_STICKY_SECONDS = 5
+
+# Выполняются для каждого нового соединения с SQLite (см. core.db)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -16000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
 }
 
 
@@ -131,26 +178,114 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# JSON API (api.views): наибольший ?limit= и пачка выгрузки из БД
+API_MAX_PAGE_SIZE = 100
+API_EXPORT_CHUNK_SIZE = 500
+
+# Отдавать собранную статику самим (core.views.serve_static)
+STATIC_SERVE = False
+
+# Ответы короче не сжимаются (core.middleware.ThresholdGZipMiddleware)
+GZIP_MIN_LENGTH = 1024
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь (jobs.mail), а отправляет их фоновая задача
+# через EMAIL_QUEUE_BACKEND пачками по EMAIL_QUEUE_BATCH_SIZE
+EMAIL_BACKEND = 'jobs.mail.QueuedEmailBackend'
+EMAIL_QUEUE_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_QUEUE_BATCH_SIZE = 100
+# Сколько раз пробовать отправить письмо, которое сервер отвергает
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+# Адрес сайта для ссылок в письмах
+SITE_URL = os.environ.get('YATUBE_SITE_URL', 'http://127.0.0.1:8000')
 
 POSTS_PER_PAGE = 10
+# Комментарии под постом подгружаются порциями по курсору
+COMMENTS_PER_PAGE = 20
+# Курсорная паджинация лент по (pub_date, id) вместо COUNT(*) + OFFSET
+POSTS_CURSOR_PAGINATION = False
+# С этого числа подписчиков посты автора не раздаются по лентам,
+# а подмешиваются в ленту подписок при чтении
+TIMELINE_CELEBRITY_FOLLOWERS = 1000
+
+# Фоновые задачи (jobs). JOBS_EAGER выполняет их сразу при постановке,
+# без воркера run_jobs
+JOBS_EAGER = True
+JOBS_POLL_INTERVAL = 1
+# Задержка перед повтором упавшей задачи, удваивается с каждой попыткой
+JOBS_RETRY_DELAY = 10
+# Задача, которая выполняется дольше, возвращается в очередь
+JOBS_STALE_AFTER = 10 * 60
+JOBS_KEEP_DONE_DAYS = 7
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Размеры миниатюр картинок постов: имя -> (геометрия, опции sorl)
+POSTS_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# Загруженные картинки уменьшаются до этого размера по большей стороне
+# и перекодируются без метаданных (posts.images). 'WEBP' - если Pillow
+# собран с libwebp, иначе сохраняется JPEG
+POSTS_IMAGE_MAX_SIZE = 1920
+POSTS_IMAGE_FORMAT = 'JPEG'
+POSTS_IMAGE_QUALITY = 85
+# Миниатюры создаются фоновой задачей после сохранения поста. В режиме
+# отладки - сразу после коммита, в том же процессе
+POSTS_THUMBNAILS_ASYNC = not DEBUG
+
+# Полнотекстовый поиск: бэкенд и предельное число результатов
+SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+SEARCH_MAX_RESULTS = 1000
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 POSTS_MEDIA_ROOT = 'posts/'
+# Картинки постов хранятся по хешу содержимого (posts.storage). Файл,
+# на который не осталось ссылок, удаляется не раньше, чем через
+# столько секунд после последнего изменения (posts.media). Удаляет
+# их воркер run_jobs; с JOBS_EAGER свежие файлы удаляет только
+# manage.py collect_media
+MEDIA_GC_GRACE = 60 * 60
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+# Общий для всех воркеров кеш. Если задан YATUBE_SHARED_CACHE (путь к
+# каталогу для файлового кеша или адрес memcached), default становится
+# двухуровневым: память процесса перед общим кешем.
+SHARED_CACHE_LOCATION = os.environ.get('YATUBE_SHARED_CACHE')
+if SHARED_CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'NEAR_TIMEOUT': 5,
+                'NEAR_MAX_ENTRIES': 1000,
+                'NEAR_EXCLUDE_PREFIXES': ('version:',),
+            },
+        },
+        'shared': {
+            'BACKEND': os.environ.get(
+                'YATUBE_SHARED_CACHE_BACKEND',
+                'django.core.cache.backends.filebased.FileBasedCache',
+            ),
+            'LOCATION': SHARED_CACHE_LOCATION,
+        },
+    }
+    # MAX_ENTRIES понимают только кеши с отбором записей на стороне
+    # Django. Бэкенды memcached передают OPTIONS клиенту как аргументы
+    if CACHES['shared']['BACKEND'].endswith(('FileBasedCache', 'LocMemCache')):
+        CACHES['shared']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+# Страницы сбрасываются сигналами при изменении данных (core.cache),
+# поэтому храним их долго
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
@@ -0,0 +1,64 @@
+"""
+Настройки для боевого окружения.
+
+DJANGO_SETTINGS_MODULE=yatube.settings_production
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import (
+    DATABASES,
+    SHARED_CACHE_LOCATION,
+    SQLITE_PRAGMAS,
+    TEMPLATES,
+)
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('SECRET_KEY', SECRET_KEY)  # noqa: F405
+
+# Шаблоны разбираются один раз на процесс и прогреваются при старте
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    (
+        'django.template.loaders.cached.Loader',
+        [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ],
+    ),
+]
+TEMPLATE_WARMUP = True
+
+POSTS_THUMBNAILS_ASYNC = True
+# Побочные действия записи выполняет воркер manage.py run_jobs
+JOBS_EAGER = False
+# Воркер сбрасывает версии кеша страниц (миниатюры и т.п.). В кеше
+# памяти процесса веб-процессы этого бы не увидели
+if not SHARED_CACHE_LOCATION:
+    raise ImproperlyConfigured(
+        'Задайте YATUBE_SHARED_CACHE: фоновые задачи сбрасывают кеш '
+        'страниц, и он должен быть общим для всех процессов'
+    )
+
+# И для default, и для реплик из YATUBE_DB_REPLICAS
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = 600
+SQLITE_PRAGMAS['cache_size'] = -64000
+SQLITE_PRAGMAS['mmap_size'] = 512 * 1024 * 1024
+
+METRICS_ENABLED = True
+
+# Статика с хешами в именах и заранее сжатыми копиями (core.storage)
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_SERVE = True
+
+# Письма из очереди (jobs.mail) уходят через SMTP
+EMAIL_QUEUE_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS') == '1'